@@ -17,23 +17,38 @@ __version__ = get_version(VERSION)
 if not __SETUP__:
     from .promise import (
         Promise,
+        TimeoutError,
+        AggregateError,
         promise_for_dict,
         promisify,
         is_thenable,
         async_instance,
+        get_async_instance,
         get_default_scheduler,
         set_default_scheduler
     )
-    from .scheduler import SyncScheduler, ThreadScheduler
+    from .promise_list import SettledResult
+    from .scheduler import (
+        SyncScheduler,
+        ThreadScheduler,
+        ThreadPoolScheduler,
+        AsyncioScheduler
+    )
 
     __all__ = [
         'Promise',
+        'TimeoutError',
+        'AggregateError',
         'promise_for_dict',
         'promisify',
         'is_thenable',
         'async_instance',
+        'get_async_instance',
         'get_default_scheduler',
         'set_default_scheduler',
+        'SettledResult',
         'SyncScheduler',
-        'ThreadScheduler'
+        'ThreadScheduler',
+        'ThreadPoolScheduler',
+        'AsyncioScheduler'
     ]
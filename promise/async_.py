@@ -1,20 +1,69 @@
 # Based on https://github.com/petkaantonov/bluebird/blob/master/src/promise.js
-from .compat import Queue
+from collections import deque
+from threading import Condition, Lock, current_thread  # flake8: noqa
 
+from .compat import get_ident, monotonic
 
-# https://docs.python.org/2/library/queue.html#Queue.Queue
-LATE_QUEUE_CAPACITY = 0  # The queue size is infinite
-NORMAL_QUEUE_CAPACITY = 0  # The queue size is infinite
+
+# How many settled handlers may be nested inline before falling
+# back to the trampoline
+FAST_PATH_MAX_DEPTH = 50
 
 
 class Async(object):
 
+    # Set once any thread hands a callback over, until then leaving
+    # a Context doesn't need to look for handoffs
+    has_handoffs = False
+
     def __init__(self, schedule):
+        # The thread this trampoline belongs to
+        self.owner = get_ident()
+        self.owner_thread = current_thread()
         self.is_tick_used = False
-        self.late_queue = Queue(LATE_QUEUE_CAPACITY)
-        self.normal_queue = Queue(NORMAL_QUEUE_CAPACITY)
+        # deque append and popleft are atomic, so the trampoline
+        # queues don't need a lock of their own
+        self.late_queue = deque()  # type: deque
+        self.normal_queue = deque()  # type: deque
+        # Callbacks handed over from other threads with invoke_threadsafe,
+        # they only run on the owner thread
+        self.handoff_queue = deque()  # type: deque
+        self.handoff_lock = Lock()
+        self.is_handoff_scheduled = False
+        # Set while run_handoffs runs, so leaving a Context in one of
+        # the callbacks doesn't start running the rest nested in it
+        self.is_running_handoffs = False
+        # The condition the owner is blocked on in Promise.get, notified
+        # when a callback is handed over
+        self.waiter = None  # type: Condition
+        # Promises waiting to be settled by the running settle_promises_now
+        self.settle_queue = deque()  # type: deque
+        self.is_settling = False
         self.have_drained_queues = False
         self.trampoline_enabled = True
+        self.fast_path_enabled = False
+        self.fast_path_max_depth = FAST_PATH_MAX_DEPTH
+        self.fast_path_depth = 0
+        # Per tick budget, None means unlimited
+        self.max_tick_callbacks = None  # type: int
+        self.max_tick_time = None  # type: float
+        self.tick_callbacks = 0
+        self.tick_deadline = None  # type: float
+        # How many ticks were drained and how many ran out of budget
+        self.ticks = 0
+        self.budget_exhausted = 0
+        # The thread running drain_queues, so a synchronous scheduler
+        # calling it again for the next tick doesn't recurse. Both are
+        # only changed under drain_lock, a threaded scheduler may call it
+        # again from another thread before the running drain returns.
+        self.draining_thread = None  # type: int
+        self.is_drain_rescheduled = False
+        self.drain_lock = Lock()
+        # The tick is claimed and released under tick_lock, a drain
+        # running on a pool worker re-checks the queue before releasing
+        # it, so a callback added meanwhile by another thread isn't left
+        # behind without a tick
+        self.tick_lock = Lock()
         self.schedule = schedule
 
     def enable_trampoline(self):
@@ -23,19 +72,41 @@ class Async(object):
     def disable_trampoline(self):
         self.trampoline_enabled = False
 
+    def enable_fast_path(self, max_depth=FAST_PATH_MAX_DEPTH):
+        """
+        Run handlers attached to already settled promises inline,
+        instead of queueing them in the trampoline.
+        """
+        self.fast_path_enabled = True
+        self.fast_path_max_depth = max_depth
+
+    def disable_fast_path(self):
+        self.fast_path_enabled = False
+
+    def set_tick_budget(self, max_callbacks=None, max_time=None):
+        """
+        Limit how many callbacks (or seconds) a single drain may take.
+        Once the budget is spent the drain schedules itself again for the
+        remaining callbacks. Only a scheduler that runs calls later
+        (Thread, ThreadPool or Asyncio) yields in between, with the
+        SyncScheduler the next slice runs right away in the same loop.
+        """
+        self.max_tick_callbacks = max_callbacks
+        self.max_tick_time = max_time
+
     def have_items_queued(self):
         return self.is_tick_used or self.have_drained_queues
 
     def _async_invoke_later(self, fn, context):
-        self.late_queue.put(fn)
+        self.late_queue.append(fn)
         self.queue_tick(context)
 
     def _async_invoke(self, fn, context):
-        self.normal_queue.put(fn)
+        self.normal_queue.append(fn)
         self.queue_tick(context)
 
     def _async_settle_promise(self, promise):
-        self.normal_queue.put(promise)
+        self.normal_queue.append(promise)
         self.queue_tick(context=promise._trace)
 
     def invoke_later(self, fn, context):
@@ -60,6 +131,87 @@ class Async(object):
                 promise._settle_promises
             )
 
+    def settle_promises_now(self, promise):
+        """
+        Settle promise synchronously. Promises settled by its handlers
+        are queued and settled by the outermost call, so long chains
+        run in a loop instead of recursing once per link.
+        """
+        queue = self.settle_queue
+        if self.is_settling:
+            queue.append(promise)
+            return
+
+        self.is_settling = True
+        try:
+            promise._settle_promises()
+            popleft = queue.popleft
+            while queue:
+                popleft()._settle_promises()
+        finally:
+            self.is_settling = False
+            # Only left behind if a handler raised,
+            # the trampoline settles the rest
+            while queue:
+                self._async_settle_promise(queue.popleft())
+
+    def invoke_threadsafe(self, fn):
+        """
+        Hand fn over to this trampoline from any thread, it always runs
+        on the owner thread. From a foreign thread it waits until the
+        owner runs its handoffs: while it's blocked in Promise.get or
+        Promise.get_many, when it leaves its outermost Context, when it
+        drains its own queues, or right away with a scheduler that runs
+        calls on the loop's thread, like the AsyncioScheduler. Once the
+        owner thread has exited, fn is scheduled like any other call.
+        """
+        if get_ident() == self.owner:
+            return self.invoke(fn, None)
+        if not self.owner_thread.is_alive():
+            # Nobody is left to run the handoffs
+            return self.schedule.call(fn)
+        Async.has_handoffs = True
+        with self.handoff_lock:
+            self.handoff_queue.append(fn)
+            # Claimed under the lock run_handoffs releases it with
+            schedule_handoffs = not self.is_handoff_scheduled and \
+                getattr(self.schedule, 'runs_in_loop_thread', False)
+            if schedule_handoffs:
+                self.is_handoff_scheduled = True
+        waiter = self.waiter
+        if waiter is not None:
+            with waiter:
+                waiter.notify_all()
+        if schedule_handoffs:
+            self.schedule.call(self.run_handoffs)
+
+    def run_handoffs(self):
+        """
+        Run the callbacks handed over from other threads in the calling
+        thread, which should be the owner one.
+        """
+        handoff_queue = self.handoff_queue
+        popleft = handoff_queue.popleft
+        was_running = self.is_running_handoffs
+        self.is_running_handoffs = True
+        try:
+            while True:
+                try:
+                    fn = popleft()
+                except IndexError:
+                    with self.handoff_lock:
+                        if not handoff_queue:
+                            self.is_handoff_scheduled = False
+                            return
+                    continue
+                # Same as the schedulers, errors don't reach the owner's caller
+                try:
+                    fn()
+                except:
+                    pass
+        finally:
+            self.is_running_handoffs = was_running
+
     def throw_later(self, reason):
         def fn():
             raise reason
@@ -69,25 +221,111 @@ class Async(object):
     fatal_error = throw_later
 
     def drain_queue(self, queue):
+        """
+        Run the callbacks in queue, returns False when the tick
+        budget ran out before the queue was empty.
+        """
         from .promise import Promise
-        while not queue.empty():
-            fn = queue.get()
+        popleft = queue.popleft
+        if self.max_tick_callbacks is None and self.max_tick_time is None:
+            while queue:
+                fn = popleft()
+                if (isinstance(fn, Promise)):
+                    fn._settle_promises()
+                    continue
+                fn()
+            return True
+
+        while queue:
+            fn = popleft()
             if (isinstance(fn, Promise)):
                 fn._settle_promises()
-                continue
-            fn()
+            else:
+                fn()
+            # Checked after running, so every tick makes progress
+            self.tick_callbacks += 1
+            if queue and self.is_budget_exhausted():
+                self.budget_exhausted += 1
+                return False
+        return True
+
+    def is_budget_exhausted(self):
+        if self.max_tick_callbacks is not None and self.tick_callbacks >= self.max_tick_callbacks:
+            return True
+        return self.tick_deadline is not None and monotonic() >= self.tick_deadline
+
+    def drain_handoff_queue(self):
+        handoff_queue = self.handoff_queue
+        popleft = handoff_queue.popleft
+        append = self.normal_queue.append
+        while handoff_queue:
+            try:
+                append(popleft())
+            except IndexError:
+                # Taken by a run_handoffs scheduled on the loop meanwhile
+                break
 
     def drain_queues(self):
         assert self.is_tick_used
-        self.drain_queue(self.normal_queue)
-        self.reset()
+        ident = get_ident()
+        with self.drain_lock:
+            if self.draining_thread is not None:
+                # Scheduled again while a drain runs, either from the drain
+                # itself by a synchronous scheduler or from another thread
+                # before it returned. The running drain takes the next tick.
+                self.is_drain_rescheduled = True
+                return
+            self.draining_thread = ident
+        try:
+            while True:
+                self._drain_tick()
+                with self.drain_lock:
+                    # Checked together with releasing the drain,
+                    # so a late call can't be lost in between
+                    if not self.is_drain_rescheduled:
+                        self.draining_thread = None
+                        return
+                    self.is_drain_rescheduled = False
+        except:
+            with self.drain_lock:
+                self.draining_thread = None
+                self.is_drain_rescheduled = False
+            raise
+
+    def _drain_tick(self):
+        self.ticks += 1
+        self.tick_callbacks = 0
+        if self.max_tick_time is not None:
+            self.tick_deadline = monotonic() + self.max_tick_time
+        else:
+            self.tick_deadline = None
+
+        if self.handoff_queue and get_ident() == self.owner:
+            # Draining on the owner thread, the handed over callbacks
+            # run in this tick
+            self.drain_handoff_queue()
+        if not self.drain_queue(self.normal_queue):
+            # Keep the tick, the rest is drained on the next call
+            self.schedule.call(self.drain_queues)
+            return
+        with self.tick_lock:
+            is_drained = not self.normal_queue
+            if is_drained:
+                self.reset()
+        if not is_drained:
+            # Added after the last check, keep the tick for it
+            self.schedule.call(self.drain_queues)
+            return
         self.have_drained_queues = True
-        self.drain_queue(self.late_queue)
+        if not self.drain_queue(self.late_queue):
+            self.queue_context_tick()
 
     def queue_context_tick(self):
-        if not self.is_tick_used:
+        with self.tick_lock:
+            if self.is_tick_used:
+                return
             self.is_tick_used = True
-            self.schedule.call(self.drain_queues)
+        self.schedule.call(self.drain_queues)
 
     def queue_tick(self, context):
         if not context:
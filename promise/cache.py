@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from threading import Lock
+
+from typing import Any, Hashable, Optional  # flake8: noqa
+
+from .compat import monotonic
+
+# Python 2 OrderedDict can't reorder, entries are reinserted instead
+_move_to_end = getattr(OrderedDict, 'move_to_end', None)
+
+
+class LRUCache(object):
+    """
+    A bounded cache_map for DataLoader.
+    Keeps at most max_size entries, evicting the least recently used
+    one when full. With a ttl, entries older than ttl seconds are
+    dropped when they are next looked up.
+    It's safe to share between threads, lookups reorder the entries
+    so they take the same lock as writes.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        # type: (int, Optional[float]) -> None
+        if max_size < 1:
+            raise TypeError((
+                'LRUCache max_size must be a positive integer, '
+                'but got: {}.'
+            ).format(max_size))
+        self.max_size = max_size
+        self.ttl = ttl
+        # Entries are (value, expires_at), oldest first
+        self._entries = OrderedDict()  # type: OrderedDict
+        self._lock = Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def __getitem__(self, key):
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        # type: (Hashable, Any) -> None
+        entries = self._entries
+        expires_at = None if self.ttl is None else monotonic() + self.ttl
+        with self._lock:
+            if key in entries:
+                del entries[key]
+            elif len(entries) >= self.max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+            entries[key] = (value, expires_at)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._entries[key]
+
+    def get(self, key, default=None):
+        entry = self._lookup(key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key):
+        entries = self._entries
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            expires_at = entry[1]
+            if expires_at is not None and expires_at <= monotonic():
+                del entries[key]
+                self.expirations += 1
+                return None
+            # Mark it as the most recently used
+            if _move_to_end is None:
+                del entries[key]
+                entries[key] = entry
+            else:
+                _move_to_end(entries, key)
+            return entry
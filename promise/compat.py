@@ -20,9 +20,47 @@ except ImportError:
         return False
 
 try:
-    from Queue import Queue  # type: ignore # flake8: noqa
+    from asyncio import get_event_loop  # type: ignore
 except ImportError:
-    from queue import Queue  # type: ignore # flake8: noqa
+
+    def get_event_loop():  # type: ignore
+        raise Exception("You need asyncio for using an event loop")
+
+try:
+    # Unlike get_running_loop it returns None outside of a running loop
+    from asyncio import _get_running_loop as get_running_loop  # type: ignore
+except ImportError:
+    # Older asyncio can't tell the running loop, the AsyncioScheduler
+    # then always uses the thread safe loop calls
+    def get_running_loop():  # type: ignore
+        return None
+
+try:
+    from Queue import Queue, Full  # type: ignore # flake8: noqa
+except ImportError:
+    from queue import Queue, Full  # type: ignore # flake8: noqa
+
+try:
+    BaseTimeoutError = TimeoutError  # type: ignore
+except NameError:
+
+    class BaseTimeoutError(Exception):  # type: ignore
+        pass
+
+try:
+    from time import monotonic  # type: ignore # flake8: noqa
+except ImportError:
+    from time import time as monotonic  # type: ignore # flake8: noqa
+
+try:
+    from collections.abc import Mapping  # type: ignore # flake8: noqa
+except ImportError:
+    from collections import Mapping  # type: ignore # flake8: noqa
+
+try:
+    from threading import get_ident  # type: ignore # flake8: noqa
+except ImportError:
+    from thread import get_ident  # type: ignore # flake8: noqa
 
 try:
     from .iterate_promise import iterate_promise
@@ -1,6 +1,32 @@
+from threading import local
+
 from typing import List, Callable # flake8: noqa
 
-context_stack = []
+from .async_ import Async
+
+
+class _LocalContextStack(local):
+    # Every thread enters and leaves its own contexts, so a promise
+    # only takes a context of the thread that created it as its trace
+    def __init__(self):
+        self.stack = []  # type: List[Context]
+
+
+_local_context_stack = _LocalContextStack()
+
+
+def get_context_stack():
+    # type: () -> List[Context]
+    return _local_context_stack.stack
+
+
+def run_handoffs():
+    # Leaving the outermost context the thread is between its own
+    # calls, run the callbacks other threads handed over to it
+    from .promise import get_async_instance
+    async_instance = get_async_instance()
+    if async_instance.handoff_queue and not async_instance.is_running_handoffs:
+        async_instance.run_handoffs()
 
 
 class Context(object):
@@ -17,7 +43,7 @@ class Context(object):
     def push_context(self):
         # if self._trace:
         #     self._trace._promise_created = None
-        context_stack.append(self)
+        _local_context_stack.stack.append(self)
 
     def __enter__(self):
         self.push_context()
@@ -31,6 +57,8 @@ class Context(object):
             self._exited = True
             self.pop_context()
             self.drain_queue()
+            if self._parent is None and Async.has_handoffs:
+                run_handoffs()
 
     def drain_queue(self):
         exit_fns = self._exit_fns
@@ -45,7 +73,7 @@ class Context(object):
             self._exit_fns.append(fn)
 
     def pop_context(self):
-        context_stack.pop()
+        _local_context_stack.stack.pop()
         # if self._trace:
         #     trace = context_stack.pop()
         #     ret = trace._promise_created
@@ -54,5 +82,6 @@ class Context(object):
 
     @classmethod
     def peek_context(cls):
+        context_stack = _local_context_stack.stack
         if context_stack:
             return context_stack[-1]
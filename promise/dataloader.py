@@ -1,9 +1,13 @@
-from collections import Iterable, namedtuple
+from collections import Iterable, deque, namedtuple
 from functools import partial
+from threading import Lock
 
-from typing import List, Sized  # flake8: noqa
+from typing import Any, List, Sized  # flake8: noqa
 
-from .promise import Promise, async_instance
+from .async_ import Async  # flake8: noqa
+from .promise import Promise, get_async_instance
+from .cache import LRUCache  # flake8: noqa
+from .compat import Mapping, monotonic
 from .context import Context
 
 
@@ -14,14 +18,24 @@ def get_chunks(iterable_obj, chunk_size=1):
 
 Loader = namedtuple('Loader', 'key,resolve,reject')
 
+# Default for DataLoader.missing_key_default, rejects the missing keys
+_no_default = object()
+
 
 class DataLoader(object):
 
     batch = True
     max_batch_size = None  # type: int
+    batch_window_ms = None  # type: float
+    max_batch_wait_ms = None  # type: float
+    batch_executor = None  # type: Any
+    max_concurrent_batches = None  # type: int
+    missing_key_default = _no_default  # type: Any
     cache = True
 
-    def __init__(self, batch_load_fn=None, batch=None, max_batch_size=None, cache=None, get_cache_key=None, cache_map=None):
+    def __init__(self, batch_load_fn=None, batch=None, max_batch_size=None, cache=None, get_cache_key=None, cache_map=None,
+                 batch_window_ms=None, max_batch_wait_ms=None, batch_executor=None, max_concurrent_batches=None,
+                 missing_key_default=_no_default):
 
         if batch_load_fn is not None:
             self.batch_load_fn = batch_load_fn
@@ -38,14 +52,51 @@ class DataLoader(object):
         if max_batch_size is not None:
             self.max_batch_size = max_batch_size
 
+        if batch_window_ms is not None:
+            self.batch_window_ms = batch_window_ms
+
+        if max_batch_wait_ms is not None:
+            self.max_batch_wait_ms = max_batch_wait_ms
+
+        if batch_executor is not None:
+            self.batch_executor = batch_executor
+
+        if max_concurrent_batches is not None:
+            self.max_concurrent_batches = max_concurrent_batches
+
+        if missing_key_default is not _no_default:
+            self.missing_key_default = missing_key_default
+
         if cache is not None:
             self.cache = cache
 
         if get_cache_key is not None:
             self.get_cache_key = get_cache_key
 
-        self._promise_cache = cache_map or {}
+        # Batches are run with the call() of a scheduler like the
+        # ThreadPoolScheduler, or the submit() of a concurrent.futures executor
+        self._execute_batch = None  # type: Any
+        if self.batch_executor is not None:
+            self._execute_batch = getattr(self.batch_executor, 'call', None) or \
+                getattr(self.batch_executor, 'submit', None)
+            if not callable(self._execute_batch):
+                raise TypeError((
+                    'DataLoader batch_executor must have a call() or submit() '
+                    'method that runs a function, but got: {}.'
+                ).format(self.batch_executor))
+
+        # An empty cache_map like LRUCache is falsy, only replace None
+        self._promise_cache = cache_map if cache_map is not None else {}
         self._queue = []  # type: List[Loader]
+        # Loads may come from other threads while a batch window is open
+        self._queue_lock = Lock()
+        # The trampoline of the thread that made the first load of the queue
+        self._queue_owner = None  # type: Async
+        self._last_load_time = None  # type: float
+        self._window_deadline = None  # type: float
+        # Batches waiting for one of the max_concurrent_batches to finish
+        self._pending_batches = deque()  # type: deque
+        self._batches_in_flight = 0
 
     def get_cache_key(self, key):  # type: ignore
         return key
@@ -79,24 +130,61 @@ class DataLoader(object):
 
     def do_resolve_reject(self, key, resolve, reject):
         # Enqueue this Promise to be dispatched.
-        self._queue.append(Loader(
-            key=key,
-            resolve=resolve,
-            reject=reject
-        ))
-        # Determine if a dispatch of this queue should be scheduled.
-        # A single dispatch should be scheduled per queue at the time when the
-        # queue changes from "empty" to "full".
+        with self._queue_lock:
+            self._queue.append(Loader(
+                key=key,
+                resolve=resolve,
+                reject=reject
+            ))
+            is_first = len(self._queue) == 1
+            if is_first:
+                self._queue_owner = get_async_instance()
+            if self.batch_window_ms is not None:
+                self._last_load_time = monotonic()
         # Determine if a dispatch of this queue should be scheduled.
         # A single dispatch should be scheduled per queue at the time when the
         # queue changes from "empty" to "full".
-        if len(self._queue) == 1:
-            if self.batch:
+        if is_first:
+            if not self.batch:
+                # If not batching, dispatch the (queue of one) immediately.
+                dispatch_queue(self)
+            elif self.batch_window_ms is not None:
+                # Keep the queue open for the batch window
+                self._open_batch_window()
+            else:
                 # If batching, schedule a task to dispatch the queue.
                 enqueue_post_promise_job(partial(dispatch_queue, self))
-            else:
-                # Otherwise dispatch the (queue of one) immediately.
-                dispatch_queue(self)
+
+    def _open_batch_window(self):
+        '''
+        Schedules the dispatch of the queue batch_window_ms after the last
+        load. Loads made meanwhile join the batch, but it is never held for
+        longer than max_batch_wait_ms (or batch_window_ms if not given).
+        The batch is closed once the window expires, and handed over to the
+        thread that opened it for loading. With the SyncScheduler it's
+        loaded once that thread waits on a promise.
+        '''
+        window = self.batch_window_ms / 1000.0
+        max_wait = window if self.max_batch_wait_ms is None else self.max_batch_wait_ms / 1000.0
+        self._window_deadline = monotonic() + max_wait
+        async_instance = get_async_instance()
+        # A max_batch_wait_ms shorter than the window ends the batch first
+        async_instance.schedule.call_later(min(window, max_wait), partial(self._batch_window_elapsed, async_instance))
+
+    def _batch_window_elapsed(self, async_instance):
+        # The batch is closed here, its dispatch is handed back
+        # to the trampoline that opened the window
+        with self._queue_lock:
+            due = min(self._last_load_time + self.batch_window_ms / 1000.0, self._window_deadline)
+            delay = due - monotonic()
+            if delay <= 0:
+                queue = self._queue
+                self._queue = []
+                self._queue_owner = None
+        if delay > 0:
+            async_instance.schedule.call_later(delay, partial(self._batch_window_elapsed, async_instance))
+            return
+        async_instance.invoke_threadsafe(partial(dispatch_loaders, self, queue, async_instance))
 
     def load_many(self, keys):
         '''
@@ -125,7 +213,8 @@ class DataLoader(object):
         method chaining.
         '''
         cache_key = self.get_cache_key(key)
-        del self._promise_cache[cache_key]
+        # A bounded cache_map may have evicted it already
+        self._promise_cache.pop(cache_key, None)
         return self
 
     def clear_all(self):
@@ -134,7 +223,8 @@ class DataLoader(object):
         invalidations across this particular `DataLoader`. Returns itself for
         method chaining.
         '''
-        self._promise_cache = {}
+        # Cleared in place so a custom cache_map keeps its bounds
+        self._promise_cache.clear()
         return self
 
     def prime(self, key, value):
@@ -199,7 +289,7 @@ def enqueue_post_promise_job(fn):
     if not resolved_promise:
         resolved_promise = Promise.resolve(None)
     # queue.invoke(fn)
-    async_instance.invoke(fn, context=Context.peek_context())
+    get_async_instance().invoke(fn, context=Context.peek_context())
     # Promise.resolve(None).then(lambda v: async.invoke(fn, context=Context.peek_context()))
     # resolved_promise.then(lambda v: queue.invoke(fn, context=Context.peek_context()))
 
@@ -210,22 +300,85 @@ def dispatch_queue(loader):
     from its current queue.
     '''
     # Take the current loader queue, replacing it with an empty queue.
-    queue = loader._queue
-    loader._queue = []
+    with loader._queue_lock:
+        queue = loader._queue
+        owner = loader._queue_owner
+        loader._queue = []
+        loader._queue_owner = None
+
+    dispatch_loaders(loader, queue, owner)
+
+
+def dispatch_loaders(loader, queue, owner):
+    '''
+    Perform a batch load of the given queue, which was opened by
+    the thread of the owner trampoline.
+    '''
+    if not loader.cache:
+        # Without the cache each load of a key is queued on its own,
+        # send every key once and share its result
+        queue = dedupe_queue(loader, queue)
 
     # If a maxBatchSize was provided and the queue is longer, then segment the
     # queue into multiple batches, otherwise treat the queue as a single batch.
     max_batch_size = loader.max_batch_size
+    if loader.batch_executor is None:
+        dispatch = dispatch_queue_batch
+    else:
+        # With a batch_executor the batches are loaded concurrently, and
+        # all of them are resolved on the thread that opened the queue.
+        # With a scheduler like the ThreadPoolScheduler this isn't the
+        # thread running dispatch_queue.
+        dispatch = partial(schedule_queue_batch, async_instance=owner)
 
     if max_batch_size and max_batch_size < len(queue):
         chunks = get_chunks(queue, max_batch_size)
         for chunk in chunks:
-            dispatch_queue_batch(
+            dispatch(
                 loader,
                 chunk
             )
     else:
-        dispatch_queue_batch(loader, queue)
+        dispatch(loader, queue)
+
+
+def dedupe_queue(loader, queue):
+    '''
+    Merges the loads of the same cache key into a single Loader that
+    resolves or rejects all of them.
+    '''
+    waiters_by_key = {}
+    unique = []
+    for l in queue:
+        cache_key = loader.get_cache_key(l.key)
+        try:
+            waiters = waiters_by_key.get(cache_key)
+        except TypeError:
+            # Unhashable keys can't be compared, load them as they are
+            unique.append([l])
+            continue
+        if waiters is None:
+            waiters_by_key[cache_key] = waiters = [l]
+            unique.append(waiters)
+        else:
+            waiters.append(l)
+
+    if len(unique) == len(queue):
+        return queue
+
+    return [
+        waiters[0] if len(waiters) == 1 else Loader(
+            key=waiters[0].key,
+            resolve=partial(call_all, [w.resolve for w in waiters]),
+            reject=partial(call_all, [w.reject for w in waiters])
+        )
+        for waiters in unique
+    ]
+
+
+def call_all(fns, value):
+    for fn in fns:
+        fn(value)
 
 
 def dispatch_queue_batch(loader, queue):
@@ -236,12 +389,74 @@ def dispatch_queue_batch(loader, queue):
     try:
         batch_promise = loader.batch_load_fn(keys)
     except Exception as e:
-        return failed_dispatch(
-            loader,
-            queue,
-            Exception("Data loader batch_load_fn function raised an Exception: {}".format(repr(e)))
-        )
+        return failed_batch_load(loader, queue, e)
+
+    return resolve_queue_batch(loader, queue, keys, batch_promise)
+
+
+def schedule_queue_batch(loader, queue, async_instance):
+    '''
+    Loads the batch on the loader's batch_executor, unless
+    max_concurrent_batches are already in flight, in which case it
+    waits for one of them to finish. The batch is handed back to
+    async_instance, so the handlers run on the thread that opened it.
+    '''
+    with loader._queue_lock:
+        max_concurrent_batches = loader.max_concurrent_batches
+        if max_concurrent_batches and loader._batches_in_flight >= max_concurrent_batches:
+            loader._pending_batches.append((queue, async_instance))
+            return
+        loader._batches_in_flight += 1
+
+    loader._execute_batch(partial(run_queue_batch, loader, queue, async_instance))
+
+
+def run_queue_batch(loader, queue, async_instance):
+    # Runs on the executor, the outcome is handed back to
+    # the trampoline that dispatched the batch
+    keys = [l.key for l in queue]
+    batch_promise = None
+    try:
+        batch_promise = loader.batch_load_fn(keys)
+    except Exception as e:
+        resolve = partial(failed_batch_load, loader, queue, e)
+    else:
+        resolve = partial(resolve_queue_batch, loader, queue, keys, batch_promise)
+    async_instance.invoke_threadsafe(partial(finish_queue_batch, loader, resolve, batch_promise))
+
+
+def finish_queue_batch(loader, resolve, batch_promise):
+    # The slot is freed before the loads are settled, so it's free
+    # again by the time their handlers run
+    if isinstance(batch_promise, Promise):
+        # Subscribed ahead of resolve, the handlers run in order
+        finished = lambda v: queue_batch_finished(loader)
+        batch_promise.then(finished, finished)
+    else:
+        queue_batch_finished(loader)
+    resolve()
+
+
+def queue_batch_finished(loader):
+    # Batches of several threads share the slots, the pending batch
+    # keeps the trampoline that dispatched it
+    with loader._queue_lock:
+        loader._batches_in_flight -= 1
+        pending = loader._pending_batches.popleft() if loader._pending_batches else None
+    if pending is not None:
+        queue, async_instance = pending
+        schedule_queue_batch(loader, queue, async_instance)
+
+
+def failed_batch_load(loader, queue, error):
+    return failed_dispatch(
+        loader,
+        queue,
+        Exception("Data loader batch_load_fn function raised an Exception: {}".format(repr(error)))
+    )
 
+
+def resolve_queue_batch(loader, queue, keys, batch_promise):
     # Assert the expected response from batch_load_fn
     if not batch_promise or not isinstance(batch_promise, Promise):
         return failed_dispatch(
@@ -256,6 +471,10 @@ def dispatch_queue_batch(loader, queue):
 
     def batch_promise_resolved(values):
         # type: (Sized) -> None
+        # A mapping of key to value doesn't need to follow the keys order
+        if isinstance(values, Mapping):
+            return resolve_queue_mapping(loader, queue, values)
+
         # Assert the expected resolution from batchLoadFn.
         if not isinstance(values, Iterable):
             raise TypeError((
@@ -282,7 +501,29 @@ def dispatch_queue_batch(loader, queue):
             else:
                 l.resolve(value)
 
-    batch_promise.then(batch_promise_resolved).catch(partial(failed_dispatch, loader, queue))
+    return batch_promise.then(batch_promise_resolved).catch(partial(failed_dispatch, loader, queue))
+
+
+def resolve_queue_mapping(loader, queue, values):
+    '''
+    Resolves every load with the value of its key in values. Keys missing
+    from values get the loader's missing_key_default, or are rejected if
+    it has none.
+    '''
+    missing_key_default = loader.missing_key_default
+    for l in queue:
+        value = values.get(l.key, _no_default)
+        if value is _no_default:
+            if missing_key_default is _no_default:
+                l.reject(KeyError(
+                    'DataLoader batch_load_fn did not return a value for the key: {}.'.format(repr(l.key))
+                ))
+                continue
+            value = missing_key_default
+        if isinstance(value, Exception):
+            l.reject(value)
+        else:
+            l.resolve(value)
 
 
 def failed_dispatch(loader, queue, error):
@@ -1,38 +1,73 @@
 from collections import namedtuple
 from functools import partial, wraps
 from sys import version_info, exc_info
-from threading import Event, RLock
+from threading import Condition, Lock, local
 from types import TracebackType
+from weakref import WeakSet
 
 from six import reraise
-from typing import (List, Any, Callable, Dict, Iterator, Optional,  # flake8: noqa
-                    Union)
+from typing import (List, Any, Callable, Dict, Iterable, Iterator,  # flake8: noqa
+                    Optional, Union)
 
 from .async_ import Async
 from .compat import (Future, ensure_future, iscoroutine,  # type: ignore
-                     iterate_promise)
+                     iterate_promise, BaseTimeoutError, monotonic)
 from .utils import deprecated, integer_types, string_types, text_type, binary_type, warn
 from .context import Context
-from .promise_list import PromiseList
+from .promise_list import (PromiseList, MapPromiseList, SettledPromiseList,
+                           RacePromiseList, AnyPromiseList)
 from .scheduler import SyncScheduler
 
-async_instance = Async(SyncScheduler())
+_default_scheduler = SyncScheduler()
+_async_instances = WeakSet()  # type: WeakSet
+
+
+class _LocalAsync(local):
+    # Runs once in every thread that touches it
+    def __init__(self):
+        self.instance = Async(_default_scheduler)
+        _async_instances.add(self.instance)
+
+
+_local_async = _LocalAsync()
+
+
+def get_async_instance():
+    # type: () -> Async
+    """
+    Return the trampoline owned by the current thread.
+    Callbacks queued from a thread are drained by that thread's trampoline,
+    use Async.invoke_threadsafe to hand them to another thread's one.
+    """
+    return _local_async.instance
+
+
+# The trampoline of the thread that imported promise
+async_instance = get_async_instance()
 
 
 def get_default_scheduler():
-    return async_instance.schedule
+    return get_async_instance().schedule
 
 
 def set_default_scheduler(scheduler):
-    async_instance.schedule = scheduler
+    global _default_scheduler
+    _default_scheduler = scheduler
+    for instance in list(_async_instances):
+        instance.schedule = scheduler
 
 
 IS_PYTHON2 = version_info[0] == 2
 DEFAULT_TIMEOUT = None  # type: float
 
-MAX_LENGTH = 0xFFFF | 0
 CALLBACK_SIZE = 3
 
+# Pending promises share a fixed pool of locks, picked by id.
+# Threads blocked in get() wait on the condition built on the same lock.
+LOCKS_SIZE = 64
+_locks = [Lock() for _ in range(LOCKS_SIZE)]
+_conditions = [Condition(lock) for lock in _locks]
+
 CALLBACK_FULFILL_OFFSET = 0
 CALLBACK_REJECT_OFFSET = 1
 CALLBACK_PROMISE_OFFSET = 2
@@ -54,24 +89,50 @@ STATE_REJECTED = 0
 STATE_FULFILLED = 1
 
 
+class TimeoutError(BaseTimeoutError):
+    """
+    Raised when a promise doesn't settle in the given time.
+    """
+
+
+class AggregateError(Exception):
+    """
+    Raised when every promise given to Promise.any is rejected,
+    errors holds their reasons in order.
+    """
+
+    def __init__(self, errors, message="All promises were rejected"):
+        super(AggregateError, self).__init__(message)
+        self.errors = errors
+
+
 def make_self_resolution_error():
     return TypeError("Promise is self")
 
 
-_error_obj = {
-    'e': None,
-    't': None
-}  # type: Dict[str, Union[None, Exception, TracebackType]]
+class _CaughtError(object):
+
+    __slots__ = ('e', 't')
+
+    def __init__(self, e, t):
+        self.e = e  # type: Exception
+        self.t = t  # type: TracebackType
 
 
 def try_catch(handler, *args, **kwargs):
+    # A new object per error, so concurrent handlers can't overwrite each other
     try:
         return handler(*args, **kwargs)
     except Exception as e:
-        tb = exc_info()[2]
-        _error_obj['e'] = e
-        _error_obj['t'] = tb
-        return _error_obj
+        return _CaughtError(e, exc_info()[2])
+
+
+def _lock_for(promise):
+    return _locks[(id(promise) >> 4) % LOCKS_SIZE]
+
+
+def _condition_for(promise):
+    return _conditions[(id(promise) >> 4) % LOCKS_SIZE]
 
 
 peek_context = Context.peek_context
@@ -83,47 +144,30 @@ class Promise(object):
     Promises/A+ specification.
     """
 
-    # __slots__ = ('_state', '_is_final', '_is_bound', '_is_following', '_is_async_guaranteed',
-    #              '_length', '_handlers', '_fulfillment_handler0', '_rejection_handler0', '_promise0',
-    #              '_is_waiting', '_future', '_trace', '_event_instance'
-    #              )
-
-    _state = STATE_PENDING  # type: int
-    _is_final = False
-    _is_bound = False
-    _is_following = False
-    _is_async_guaranteed = False
-    _length = 0
-    _handlers = None  # type: Dict[int, Union[Callable, None]]
-    _fulfillment_handler0 = None  # type: Union[Callable, partial]
-    _rejection_handler0 = None  # type: Union[Callable, partial]
-    _promise0 = None  # type: Promise
-    _future = None  # type: Future
-    _event_instance = None # type: Event
-    _traceback = None # type: TracebackType
-    # _trace = None
-    _is_waiting = False
+    __slots__ = ('_state', '_is_final', '_is_following', '_is_async_guaranteed',
+                 '_length', '_handlers', '_fulfillment_handler0', '_rejection_handler0', '_promise0',
+                 '_future', '_trace', '_has_waiters', '_traceback', '__weakref__'
+                 )
 
     def __init__(self, executor=None):
         # type: (Promise, Union[Callable, partial]) -> None
         """
         Initialize the Promise into a pending state.
         """
-        # self._state = STATE_PENDING  # type: int
-        # self._is_final = False
-        # self._is_bound = False
-        # self._is_following = False
-        # self._is_async_guaranteed = False
-        # self._length = 0
-        # self._handlers = None  # type: Dict[int, Union[Callable, None]]
-        # self._fulfillment_handler0 = None  # type: Union[Callable, partial]
-        # self._rejection_handler0 = None  # type: Union[Callable, partial]
-        # self._promise0 = None  # type: Promise
-        # self._future = None  # type: Future
-        # self._event_instance = None # type: Event
+        self._state = STATE_PENDING  # type: int
+        self._is_final = False
+        self._is_following = False
+        self._is_async_guaranteed = False
+        self._length = 0
+        self._handlers = None  # type: List[Union[Callable, Promise, None]]
+        self._fulfillment_handler0 = None  # type: Union[Callable, partial]
+        self._rejection_handler0 = None  # type: Union[Callable, partial]
+        self._promise0 = None  # type: Promise
+        self._future = None  # type: Future
+        self._has_waiters = False
+        self._traceback = None  # type: TracebackType
         self._trace = peek_context()
 
-        # self._is_waiting = False
         if executor is not None:
             self._resolve_from_executor(executor)
 
@@ -173,20 +217,44 @@ class Promise(object):
             return self._fulfill(value)
 
         promise = self._try_convert_to_promise(value, self)._target()
-        if promise == self:
+        if promise is self:
             self._reject(make_self_resolution_error())
             return
 
         if promise._state == STATE_PENDING:
-            len = self._length
-            if len > 0:
-                promise._migrate_callback0(self)
-            for i in range(1, len):
-                promise._migrate_callback_at(self, i)
-
-            self._is_following = True
-            self._length = 0
-            self._set_followee(promise)
+            with _lock_for(self):
+                if self._state != STATE_PENDING or self._is_following:
+                    return
+                length = self._length
+                fulfill0 = self._fulfillment_handler0
+                reject0 = self._rejection_handler0
+                promise0 = self._promise0
+                handlers = self._handlers
+
+                self._fulfillment_handler0 = None
+                self._rejection_handler0 = None
+                self._promise0 = None
+                self._handlers = None
+                self._length = 0
+                # Readers walk the chain without the lock, the followee
+                # has to be in place before they can see _is_following
+                self._set_followee(promise)
+                self._is_following = True
+                if self._has_waiters:
+                    # Waiters move on to wait for the followee
+                    _condition_for(self).notify_all()
+
+            # Locks are never nested, the followee takes its own.
+            # Slots cleared by _remove_callbacks are not moved over.
+            if length > 0 and (fulfill0 is not None or reject0 is not None or promise0 is not None):
+                promise._subscribe(fulfill0, reject0, promise0)
+            if handlers:
+                for base in range(0, len(handlers), CALLBACK_SIZE):
+                    fulfill = handlers[base + CALLBACK_FULFILL_OFFSET]
+                    reject = handlers[base + CALLBACK_REJECT_OFFSET]
+                    child = handlers[base + CALLBACK_PROMISE_OFFSET]
+                    if fulfill is not None or reject is not None or child is not None:
+                        promise._subscribe(fulfill, reject, child)
         elif promise._state == STATE_FULFILLED:
             self._fulfill(promise._value())
         elif promise._state == STATE_REJECTED:
@@ -208,34 +276,46 @@ class Promise(object):
             err = make_self_resolution_error()
             # self._attach_extratrace(err)
             return self._reject(err)
-        self._state = STATE_FULFILLED
-        self._rejection_handler0 = value
 
+        with _lock_for(self):
+            # The first settlement wins
+            if self._state != STATE_PENDING or self._is_following:
+                return
+            self._rejection_handler0 = value
+            self._state = STATE_FULFILLED
+            if self._has_waiters:
+                _condition_for(self).notify_all()
+
+        # No callbacks can be added once the state changed
         if self._length > 0:
             if self._is_async_guaranteed:
-                self._settle_promises()
+                get_async_instance().settle_promises_now(self)
             else:
-                async_instance.settle_promises(self)
+                get_async_instance().settle_promises(self)
 
     def _reject(self, reason, traceback=None):
-        self._state = STATE_REJECTED
-        self._fulfillment_handler0 = reason
-        self._traceback = traceback
-
+        with _lock_for(self):
+            if self._state != STATE_PENDING or self._is_following:
+                return
+            self._fulfillment_handler0 = reason
+            self._traceback = traceback
+            self._state = STATE_REJECTED
+            if self._has_waiters:
+                _condition_for(self).notify_all()
+
+        async_instance = get_async_instance()
         if self._is_final:
             assert self._length == 0
             return async_instance.fatal_error(reason)
 
         if self._length > 0:
-            async_instance.settle_promises(self)
+            if self._is_async_guaranteed:
+                async_instance.settle_promises_now(self)
+            else:
+                async_instance.settle_promises(self)
         else:
             self._ensure_possible_rejection_handled()
 
-        if self._is_async_guaranteed:
-            self._settle_promises()
-        else:
-            async_instance.settle_promises(self)
-
     def _ensure_possible_rejection_handled(self):
         # self._rejection_is_unhandled = True
         # async_instance.invoke_later(self._notify_unhandled_rejection, self)
@@ -248,35 +328,37 @@ class Promise(object):
         # self._attach_extratrace(trace, synchronous and has_stack)
         self._reject(reason, traceback)
 
-    def _clear_callback_data_index_at(self, index):
-        assert not self._is_following
-        assert index > 0
-        base = index * CALLBACK_SIZE - CALLBACK_SIZE
-        self._handlers[base + CALLBACK_PROMISE_OFFSET] = None
-        self._handlers[base + CALLBACK_FULFILL_OFFSET] = None
-        self._handlers[base + CALLBACK_REJECT_OFFSET] = None
-
-    def _fulfill_promises(self, length, value):
-        for i in range(1, length):
-            handler = self._fulfillment_handler_at(i)
-            promise = self._promise_at(i)
-            self._clear_callback_data_index_at(i)
-            self._settle_promise(promise, handler, value, None)
-
-    def _reject_promises(self, length, reason):
-        for i in range(1, length):
-            handler = self._rejection_handler_at(i)
-            promise = self._promise_at(i)
-            self._clear_callback_data_index_at(i)
-            self._settle_promise(promise, handler, reason, None)
+    def _fulfill_promises(self, handlers, value):
+        # Callbacks 1..N are stored as flat (fulfill, reject, promise) triples
+        for base in range(0, len(handlers), CALLBACK_SIZE):
+            self._settle_promise(
+                handlers[base + CALLBACK_PROMISE_OFFSET],
+                handlers[base + CALLBACK_FULFILL_OFFSET],
+                value,
+                None
+            )
+
+    def _reject_promises(self, handlers, reason):
+        for base in range(0, len(handlers), CALLBACK_SIZE):
+            self._settle_promise(
+                handlers[base + CALLBACK_PROMISE_OFFSET],
+                handlers[base + CALLBACK_REJECT_OFFSET],
+                reason,
+                None
+            )
 
     def _settle_promise(self, promise, handler, value, traceback):
         assert not self._is_following
-        is_promise = isinstance(promise, self.__class__)
+        is_promise = isinstance(promise, Promise)
         async_guaranteed = self._is_async_guaranteed
         if callable(handler):
             if not is_promise:
-                handler(value)  # , promise
+                if promise is None:
+                    handler(value)
+                else:
+                    # Anything else in the promise slot is passed
+                    # along, PromiseList keeps the element index there
+                    handler(value, promise)
             else:
                 if async_guaranteed:
                     promise._is_async_guaranteed = True
@@ -300,53 +382,17 @@ class Promise(object):
         x = try_catch(handler, value)  # , promise
         # promise_created = promise._pop_context()
 
-        if x == _error_obj:
-            promise._reject_callback(x['e'], False, x['t'])
+        if x.__class__ is _CaughtError:
+            promise._reject_callback(x.e, False, x.t)
         # if isinstance(x, PromiseError):
         #     promise._reject_callback(x.e, False)
         else:
             promise._resolve_callback(x)
 
-    def _promise_at(self, index):
-        assert index > 0
-        assert not self._is_following
-        return self._handlers.get(index * CALLBACK_SIZE - CALLBACK_SIZE + CALLBACK_PROMISE_OFFSET)
-
-    def _fulfillment_handler_at(self, index):
-        assert not self._is_following
-        assert index > 0
-        return self._handlers.get(index * CALLBACK_SIZE - CALLBACK_SIZE + CALLBACK_FULFILL_OFFSET)
-
-    def _rejection_handler_at(self, index):
-        assert not self._is_following
-        assert index > 0
-        return self._handlers.get(index * CALLBACK_SIZE - CALLBACK_SIZE + CALLBACK_REJECT_OFFSET)
-
-    def _migrate_callback0(self, follower):
-        self._add_callbacks(
-            follower._fulfillment_handler0,
-            follower._rejection_handler0,
-            follower._promise0,
-        )
-
-    def _migrate_callback_at(self, follower, index):
-        self._add_callbacks(
-            follower._fulfillment_handler_at(index),
-            follower._rejection_handler_at(index),
-            follower._promise_at(index),
-        )
-
     def _add_callbacks(self, fulfill, reject, promise):
         assert not self._is_following
 
-        if self._handlers is None:
-            self._handlers = {}
-
         index = self._length
-        if index > MAX_LENGTH - CALLBACK_SIZE:
-            index = 0
-            self._length = 0
-
         if index == 0:
             assert not self._promise0
             assert not self._fulfillment_handler0
@@ -359,25 +405,82 @@ class Promise(object):
                 self._rejection_handler0 = reject
 
         else:
-            base = index * CALLBACK_SIZE - CALLBACK_SIZE
+            handlers = self._handlers
+            if handlers is None:
+                handlers = self._handlers = []
 
-            assert (base + CALLBACK_PROMISE_OFFSET) not in self._handlers
-            assert (base + CALLBACK_FULFILL_OFFSET) not in self._handlers
-            assert (base + CALLBACK_REJECT_OFFSET) not in self._handlers
+            assert len(handlers) == index * CALLBACK_SIZE - CALLBACK_SIZE
 
-            self._handlers[base + CALLBACK_PROMISE_OFFSET] = promise
-            if callable(fulfill):
-                self._handlers[base + CALLBACK_FULFILL_OFFSET] = fulfill
-            if callable(reject):
-                self._handlers[base + CALLBACK_REJECT_OFFSET] = reject
+            # The order must match the CALLBACK_*_OFFSET constants
+            handlers.append(fulfill if callable(fulfill) else None)
+            handlers.append(reject if callable(reject) else None)
+            handlers.append(promise)
 
         self._length = index + 1
         return index
 
+    def _remove_callbacks(self, fulfill, reject, index=None):
+        """
+        Clear the slot of the callbacks in place, so the other slots keep
+        their index. index is the one _add_callbacks returned for them,
+        without it, or if they moved since, the slots are searched.
+        """
+        assert not self._is_following
+
+        if index is None or index >= self._length or \
+                self._callbacks_at(index)[:CALLBACK_PROMISE_OFFSET] != (fulfill, reject):
+            for index in range(self._length):
+                if self._callbacks_at(index)[:CALLBACK_PROMISE_OFFSET] == (fulfill, reject):
+                    break
+            else:
+                return
+
+        if index == 0:
+            self._fulfillment_handler0 = None
+            self._rejection_handler0 = None
+            self._promise0 = None
+        else:
+            base = index * CALLBACK_SIZE - CALLBACK_SIZE
+            self._handlers[base:base + CALLBACK_SIZE] = (None, None, None)
+
+        # Cleared slots at the end are dropped, the rest stay
+        # until the promise settles
+        handlers = self._handlers
+        length = self._length
+        while length > 1 and handlers[-1] is None and handlers[-2] is None and handlers[-3] is None:
+            del handlers[-CALLBACK_SIZE:]
+            length -= 1
+        if length == 1 and self._fulfillment_handler0 is None and \
+                self._rejection_handler0 is None and self._promise0 is None:
+            length = 0
+        if length <= 1:
+            self._handlers = None
+        self._length = length
+
+    def _callbacks_at(self, index):
+        if index == 0:
+            return (self._fulfillment_handler0, self._rejection_handler0, self._promise0)
+        base = index * CALLBACK_SIZE - CALLBACK_SIZE
+        return tuple(self._handlers[base:base + CALLBACK_SIZE])
+
     def _target(self):
-        ret = self
-        while (ret._is_following):
+        if not self._is_following:
+            return self
+        ret = self._followee()
+        if not ret._is_following:
+            return ret
+
+        # Path compression: point every follower in the chain straight
+        # at the target, so later walks take one step. Only the followers
+        # seen on this walk are rewritten, another thread may have moved
+        # their followees further down the chain meanwhile, and anything
+        # past ret may have settled or started following since.
+        followers = [self]
+        while ret._is_following:
+            followers.append(ret)
             ret = ret._followee()
+        for follower in followers:
+            follower._rejection_handler0 = ret
         return ret
 
     def _followee(self):
@@ -386,26 +489,26 @@ class Promise(object):
         return self._rejection_handler0
 
     def _set_followee(self, promise):
-        assert self._is_following
         assert not isinstance(self._rejection_handler0, Promise)
-        if not self._event_instance:
-            self._event_instance = promise._event_instance
         self._rejection_handler0 = promise
 
     def _settle_promises(self):
         length = self._length
         if length > 0:
+            handlers = self._handlers
+            self._handlers = None
+            self._length = 0
             if self._state == STATE_REJECTED:
                 reason = self._fulfillment_handler0
                 traceback = self._traceback
                 self._settle_promise0(self._rejection_handler0, reason, traceback)
-                self._reject_promises(length, reason)
+                if handlers:
+                    self._reject_promises(handlers, reason)
             else:
                 value = self._rejection_handler0
                 self._settle_promise0(self._fulfillment_handler0, value, None)
-                self._fulfill_promises(length, value)
-
-            self._length = 0
+                if handlers:
+                    self._fulfill_promises(handlers, value)
 
     def _resolve_from_executor(self, executor):
         # self._capture_stacktrace()
@@ -433,11 +536,6 @@ class Promise(object):
         if error is not None:
             self._reject_callback(error, True, traceback)
 
-    def _event(self):
-        if not self._event_instance:
-            self._event_instance = Event()
-        return self._event_instance
-
     def _wait(self, timeout=None):
         if not self.is_pending:
             # We return if the promise is already
@@ -446,11 +544,6 @@ class Promise(object):
 
         target = self._target()
 
-        def on_resolve_or_reject(_):
-            target._event().set()
-
-        target._then(on_resolve_or_reject, on_resolve_or_reject)
-
         if target._trace:
             # If we wait, we drain the queue of the
             # callbacks waiting on the context exit
@@ -459,10 +552,39 @@ class Promise(object):
 
         if timeout is None and IS_PYTHON2:
             timeout = float("Inf")
-
-        waited = target._event().wait(timeout)
-        if not waited:
-            raise Exception("Timeout")
+        deadline = None if timeout is None else monotonic() + timeout
+
+        # The settling thread notifies the condition shared by the target's
+        # lock, so waiting needs neither an Event nor a child promise.
+        # Other threads handing callbacks over to this thread notify it too,
+        # they run here while we wait.
+        async_instance = get_async_instance()
+        handoff_queue = async_instance.handoff_queue
+        while True:
+            condition = _condition_for(target)
+            with condition:
+                async_instance.waiter = condition
+                try:
+                    while target._state == STATE_PENDING and not target._is_following:
+                        if handoff_queue:
+                            break
+                        target._has_waiters = True
+                        if deadline is None:
+                            condition.wait()
+                            continue
+                        remaining = deadline - monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError("Timeout")
+                        condition.wait(remaining)
+                finally:
+                    async_instance.waiter = None
+                is_following = target._is_following
+                if not is_following and target._state != STATE_PENDING:
+                    return
+            if is_following:
+                target = target._target()
+            else:
+                async_instance.run_handoffs()
 
     def get(self, timeout=None):
         target = self._target()
@@ -515,6 +637,45 @@ class Promise(object):
         """Indicate whether the Promise has been rejected. Could be wrong the moment the function returns."""
         return self._target()._state == STATE_REJECTED
 
+    def timeout(self, seconds):
+        # type: (Promise, float) -> Promise
+        """
+        Returns a promise that settles like this one, or is rejected with
+        a TimeoutError if this one is still pending after the given seconds.
+        """
+        target = self._target()
+        if target._state != STATE_PENDING:
+            return self.__class__.resolve(target)
+
+        promise = self.__class__()
+        # The index of the handlers in target, unknown until they're added
+        slot = [None]
+
+        def on_timeout():
+            # Runs off the timer thread, which only hands it over.
+            # A target that never settles must not keep the handlers alive.
+            target._unsubscribe(on_fulfill, on_reject, slot[0])
+            if promise._state == STATE_PENDING:
+                promise._reject_callback(
+                    TimeoutError("Promise timed out after {} seconds".format(seconds))
+                )
+
+        timer = get_async_instance().schedule.call_later(seconds, on_timeout)
+
+        def on_fulfill(value):
+            timer.cancel()
+            if promise._state == STATE_PENDING:
+                promise._fulfill(value)
+
+        def on_reject(reason):
+            timer.cancel()
+            if promise._state == STATE_PENDING:
+                promise._reject_callback(reason, False, target._traceback)
+
+        # No child promise is needed, the handlers settle promise themselves
+        slot[0] = target._subscribe(on_fulfill, on_reject, None)
+        return promise
+
     def catch(self, on_rejection):
         # type: (Promise, Union[Callable, partial]) -> Promise
         """
@@ -523,23 +684,47 @@ class Promise(object):
         """
         return self.then(None, on_rejection)
 
-    def _then(self, did_fulfill=None, did_reject=None):
-        promise = self.__class__()
+    def _subscribe(self, did_fulfill, did_reject, promise):
+        """
+        Add the callbacks to the target while it's pending, or settle
+        promise with them if it's already settled.
+        Returns the index of their slot in the target if they were added,
+        for _unsubscribe.
+        """
         target = self._target()
-
         state = target._state
-        if state == STATE_PENDING:
-            target._add_callbacks(did_fulfill, did_reject, promise)
+        while state == STATE_PENDING:
+            with _lock_for(target):
+                # Check again, another thread may have settled it
+                if not target._is_following:
+                    state = target._state
+                    if state == STATE_PENDING:
+                        return target._add_callbacks(did_fulfill, did_reject, promise)
+                    break
+            # It started following another promise meanwhile
+            target = target._target()
+            state = target._state
+
+        traceback = None
+        if state == STATE_FULFILLED:
+            value = target._rejection_handler0
+            handler = did_fulfill
+        elif state == STATE_REJECTED:
+            value = target._fulfillment_handler0
+            traceback = target._traceback
+            handler = did_reject
+            # target._rejection_is_unhandled = False
+        async_instance = get_async_instance()
+        if async_instance.fast_path_enabled and \
+                async_instance.fast_path_depth < async_instance.fast_path_max_depth:
+            # Run the handler inline, the depth bound keeps
+            # nested settled then() calls from exhausting the stack
+            async_instance.fast_path_depth += 1
+            try:
+                target._settle_promise(promise, handler, value, traceback)
+            finally:
+                async_instance.fast_path_depth -= 1
         else:
-            traceback = None
-            if state == STATE_FULFILLED:
-                value = target._rejection_handler0
-                handler = did_fulfill
-            elif state == STATE_REJECTED:
-                value = target._fulfillment_handler0
-                traceback = target._traceback
-                handler = did_reject
-                # target._rejection_is_unhandled = False
             async_instance.invoke(
                 partial(target._settle_promise, promise, handler, value, traceback),
                 context=target._trace,
@@ -549,6 +734,24 @@ class Promise(object):
                 # Context(handler, promise, value),
             )
 
+    def _unsubscribe(self, did_fulfill, did_reject, index=None):
+        """
+        Remove the callbacks added with _subscribe while the target is
+        still pending, so it stops referencing them. index is the one
+        _subscribe returned, it saves searching for them.
+        """
+        target = self._target()
+        while target._state == STATE_PENDING:
+            with _lock_for(target):
+                if not target._is_following:
+                    if target._state == STATE_PENDING:
+                        target._remove_callbacks(did_fulfill, did_reject, index)
+                    return
+            target = target._target()
+
+    def _then(self, did_fulfill=None, did_reject=None):
+        promise = self.__class__()
+        self._subscribe(did_fulfill, did_reject, promise)
         return promise
 
     fulfill = _resolve_callback
@@ -691,6 +894,17 @@ class Promise(object):
     cast = resolve
     fulfilled = cast
 
+    @classmethod
+    def delay(cls, seconds, value=None):
+        # type: (float, Any) -> Promise
+        """
+        Returns a promise that resolves with value once the given
+        number of seconds have passed.
+        """
+        ret = cls()
+        get_async_instance().schedule.call_later(seconds, partial(ret._resolve_callback, value))
+        return ret
+
     @classmethod
     def promisify(cls, f):
         if not callable(f):
@@ -720,6 +934,139 @@ class Promise(object):
     def all(cls, promises):
         return PromiseList(promises, promise_class=cls).promise
 
+    @classmethod
+    def all_settled(cls, promises):
+        # type: (Iterable[Any]) -> Promise
+        """
+        Returns a promise for a list with a SettledResult(state, value) for
+        every promise, once all of them are either fulfilled or rejected.
+        """
+        return SettledPromiseList(promises, promise_class=cls).promise
+
+    @classmethod
+    def race(cls, promises):
+        # type: (Iterable[Any]) -> Promise
+        """
+        Returns a promise that settles like the first of the promises to
+        settle, the rest are detached from once it does.
+        """
+        return RacePromiseList(promises, promise_class=cls).promise
+
+    @classmethod
+    def any(cls, promises):
+        # type: (Iterable[Any]) -> Promise
+        """
+        Returns a promise fulfilled with the first of the promises to be
+        fulfilled, the rest are detached from once it is. If all of them
+        are rejected it's rejected with an AggregateError of the reasons.
+        """
+        return AnyPromiseList(promises, promise_class=cls).promise
+
+    @classmethod
+    def map(cls, values, fn, concurrency=None):
+        # type: (Iterable[Any], Callable, Optional[int]) -> Promise
+        """
+        Returns a promise for the list of fn(value) for every value, in
+        order. At most concurrency of the returned promises are pending at
+        once, the next value is only mapped when one of them settles.
+        """
+        if concurrency is not None and concurrency < 1:
+            raise TypeError((
+                'Promise.map() concurrency must be a positive integer, '
+                'but got: {}.'
+            ).format(concurrency))
+        return MapPromiseList(values, fn, promise_class=cls, concurrency=concurrency).promise
+
+    @classmethod
+    def get_many(cls, promises, timeout=None):
+        # type: (List[Any], float) -> List[Any]
+        """
+        Blocks once until every promise is fulfilled and returns their
+        values in order, or raises the first rejection found.
+        Unlike Promise.all(promises).get() no aggregate promise is created.
+        """
+        targets = [
+            cls._try_convert_to_promise(value)._target() if cls.is_thenable(value) else value
+            for value in promises
+        ]
+        pending = [
+            target for target in targets
+            if isinstance(target, Promise) and target._state == STATE_PENDING
+        ]
+        # An already rejected promise is raised right away, like Promise.all
+        is_rejected = any(
+            isinstance(target, Promise) and target._state == STATE_REJECTED
+            for target in targets
+        )
+
+        if pending and not is_rejected:
+            condition = Condition(Lock())
+            state = {'remaining': len(pending), 'rejected': False}
+
+            def on_fulfill(value):
+                with condition:
+                    state['remaining'] -= 1
+                    condition.notify()
+
+            def on_reject(reason):
+                with condition:
+                    state['rejected'] = True
+                    condition.notify()
+
+            subscriptions = []
+            for target in pending:
+                subscriptions.append(target._subscribe(on_fulfill, on_reject, None))
+                if target._trace:
+                    # Same as in _wait, avoid blocking on callbacks
+                    # waiting for the context to exit
+                    target._trace.drain_queue()
+
+            timeout = timeout or DEFAULT_TIMEOUT
+            if timeout is None and IS_PYTHON2:
+                timeout = float("Inf")
+            deadline = None if timeout is None else monotonic() + timeout
+
+            # Same as in _wait, callbacks handed over to this thread run here
+            async_instance = get_async_instance()
+            handoff_queue = async_instance.handoff_queue
+            try:
+                while True:
+                    with condition:
+                        async_instance.waiter = condition
+                        try:
+                            while state['remaining'] and not state['rejected']:
+                                if handoff_queue:
+                                    break
+                                if deadline is None:
+                                    condition.wait()
+                                    continue
+                                remaining = deadline - monotonic()
+                                if remaining <= 0:
+                                    raise TimeoutError("Timeout")
+                                condition.wait(remaining)
+                        finally:
+                            async_instance.waiter = None
+                        if not state['remaining'] or state['rejected']:
+                            break
+                    async_instance.run_handoffs()
+            finally:
+                if state['remaining']:
+                    # Leaving on a rejection or a timeout, the promises
+                    # still pending shouldn't keep the callbacks
+                    for target, index in zip(pending, subscriptions):
+                        target._unsubscribe(on_fulfill, on_reject, index)
+
+        values = []
+        for target in targets:
+            if isinstance(target, Promise):
+                target = target._target()
+                if target._state == STATE_REJECTED:
+                    target._settled_value(_raise=True)
+                values.append(target._rejection_handler0)
+            else:
+                values.append(target)
+        return values
+
     @classmethod
     def for_dict(cls, m):
         # type: (Dict[Any, Promise]) -> Promise
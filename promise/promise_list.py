@@ -1,13 +1,19 @@
-from functools import partial
-from collections import Iterable
+from collections import Iterable, namedtuple
+from types import GeneratorType
 
 
 class PromiseList(object):
 
-    __slots__ = ('_values', '_length', '_total_resolved', 'promise', '_promise_class')
+    __slots__ = ('_values', '_length', '_total_resolved', '_is_iterating', 'promise', '_promise_class',
+                 '_subscriptions')
+
+    # Lists that detach from their pending values keep the index
+    # of their callbacks in each of them
+    _detaches = False
 
     def __init__(self, values, promise_class):
         self._promise_class = promise_class
+        self._subscriptions = {} if self._detaches else None
         self.promise = self._promise_class()
         # if (isinstance(values, Promise)):
         #     # promise._propagate_from(values)
@@ -16,6 +22,7 @@ class PromiseList(object):
         self._values = values
         self._length = 0
         self._total_resolved = 0
+        self._is_iterating = False
         self._init()
 
     def __len__(self):
@@ -24,7 +31,9 @@ class PromiseList(object):
     def _init(self):
         Promise = self._promise_class
         values = self._values
-        if Promise.is_thenable(values):
+        # asyncio.iscoroutine also accepts plain generators, which here are
+        # iterables of values rather than coroutines
+        if not isinstance(values, GeneratorType) and Promise.is_thenable(values):
             values = Promise._try_convert_to_promise(self._values, self.promise)._target()
             if values.is_fulfilled:
                 values = values._value()
@@ -44,42 +53,76 @@ class PromiseList(object):
             return
 
         if not values:
-            self._resolve([])
+            self._values = []
+            self._resolve_values()
             return
 
         self._iterate(values)
 
     def _iterate(self, values):
+        from .promise import STATE_PENDING, STATE_FULFILLED
         Promise = self._promise_class
         is_resolved = False
-        self._length = len(values)
-        self._values = [None] * self._length
+        try:
+            self._length = len(values)
+        except TypeError:
+            # Generators and other unsized iterables are consumed in one
+            # pass, growing the results as we go
+            self._length = None
+        is_sized = self._length is not None
+        if is_sized:
+            self._values = [None] * self._length
+        else:
+            self._length = 0
+            self._values = []
+            self._is_iterating = True
 
         result = self.promise
+        # Shared by every element, the index travels in the promise slot
+        promise_fulfilled = self._promise_fulfilled
+        promise_rejected = self._promise_rejected
+        subscriptions = self._subscriptions
 
-        for i, val in enumerate(values):
-            if Promise.is_thenable(val):
-                maybe_promise = Promise._try_convert_to_promise(val, self.promise)._target()
-                # if is_resolved:
-                #     # maybe_promise.suppressUnhandledRejections
-                #     pass
-                if maybe_promise.is_pending:
-                    maybe_promise._add_callbacks(
-                        partial(self._promise_fulfilled, i=i),
-                        self._promise_rejected,
-                        None
-                    )
-                    self._values[i] = maybe_promise
-                elif maybe_promise.is_fulfilled:
-                    is_resolved = self._promise_fulfilled(maybe_promise._value(), i)
-                elif maybe_promise.is_rejected:
-                    is_resolved = self._promise_rejected(maybe_promise._reason())
+        try:
+            for i, val in enumerate(values):
+                if not is_sized:
+                    self._values.append(None)
+                    self._length += 1
 
-            else:
-                is_resolved = self._promise_fulfilled(val, i)
+                if isinstance(val, Promise):
+                    target = val._target()
+                elif Promise.is_thenable(val):
+                    target = Promise._try_convert_to_promise(val, self.promise)._target()
+                else:
+                    is_resolved = promise_fulfilled(val, i)
+                    if is_resolved:
+                        break
+                    continue
+
+                state = target._state
+                if state == STATE_PENDING:
+                    self._values[i] = target
+                    subscription = target._subscribe(promise_fulfilled, promise_rejected, i)
+                    if subscriptions is not None:
+                        subscriptions[i] = subscription
+                elif state == STATE_FULFILLED:
+                    is_resolved = promise_fulfilled(target._rejection_handler0, i)
+                else:
+                    is_resolved = promise_rejected(target._fulfillment_handler0, i)
+
+                if is_resolved:
+                    break
+        except Exception as e:
+            self._is_iterating = False
+            if not self.is_resolved:
+                self._reject(e)
+            return
 
-            if is_resolved:
-                break
+        if self._is_iterating:
+            self._is_iterating = False
+            if not self.is_resolved and self._total_resolved >= self._length:
+                self._resolve_values()
+                is_resolved = self.is_resolved
 
         if not is_resolved:
             result._is_async_guaranteed = True
@@ -92,12 +135,12 @@ class PromiseList(object):
         # assert isinstance(i, int)
         self._values[i] = value
         self._total_resolved += 1
-        if self._total_resolved >= self._length:
-            self._resolve(self._values)
+        if self._total_resolved >= self._length and not self._is_iterating:
+            self._resolve_values()
             return True
         return False
 
-    def _promise_rejected(self, reason):
+    def _promise_rejected(self, reason, i=None):
         if self.is_resolved:
             return
         # assert not self.is_resolved
@@ -110,6 +153,10 @@ class PromiseList(object):
     def is_resolved(self):
         return self._values is None
 
+    def _resolve_values(self):
+        # Called once every value has settled
+        self._resolve(self._values)
+
     def _resolve(self, value):
         assert not self.is_resolved
         assert not isinstance(value, self._promise_class)
@@ -120,3 +167,201 @@ class PromiseList(object):
         assert not self.is_resolved
         self._values = None
         self.promise._reject_callback(reason, False)
+
+
+class MapPromiseList(PromiseList):
+    """
+    Maps every value of an iterable through a mapper, keeping at most
+    ``concurrency`` mapped promises pending at any time.
+    """
+
+    __slots__ = ('_mapper', '_concurrency', '_iterator', '_in_flight')
+
+    def __init__(self, values, mapper, promise_class, concurrency=None):
+        self._mapper = mapper
+        self._concurrency = concurrency
+        self._iterator = None
+        self._in_flight = 0
+        super(MapPromiseList, self).__init__(values, promise_class)
+
+    def _iterate(self, values):
+        self._iterator = iter(values)
+        self._values = []
+        self._is_iterating = True
+        self._iterate_next()
+        if not self.is_resolved:
+            self.promise._is_async_guaranteed = True
+
+    def _iterate_next(self):
+        from .promise import STATE_PENDING, STATE_FULFILLED
+        Promise = self._promise_class
+        concurrency = self._concurrency
+        # Mapped promises settling while we are mapping only update the
+        # counters, the loop below picks up the freed slots
+        self._is_iterating = True
+        try:
+            while self._iterator is not None:
+                if concurrency is not None and self._in_flight >= concurrency:
+                    break
+                try:
+                    value = next(self._iterator)
+                except StopIteration:
+                    self._iterator = None
+                    break
+
+                i = self._length
+                self._values.append(None)
+                self._length += 1
+
+                value = self._mapper(value)
+                if isinstance(value, Promise):
+                    target = value._target()
+                elif Promise.is_thenable(value):
+                    target = Promise._try_convert_to_promise(value, self.promise)._target()
+                else:
+                    self._values[i] = value
+                    self._total_resolved += 1
+                    continue
+
+                state = target._state
+                if state == STATE_PENDING:
+                    self._in_flight += 1
+                    target._subscribe(self._promise_fulfilled, self._promise_rejected, i)
+                elif state == STATE_FULFILLED:
+                    self._values[i] = target._rejection_handler0
+                    self._total_resolved += 1
+                else:
+                    self._promise_rejected(target._fulfillment_handler0)
+
+                if self.is_resolved:
+                    return
+        except Exception as e:
+            self._iterator = None
+            if not self.is_resolved:
+                self._reject(e)
+            return
+        finally:
+            self._is_iterating = False
+
+        if self._iterator is None and self._total_resolved >= self._length:
+            self._resolve_values()
+
+    def _promise_fulfilled(self, value, i):
+        if self.is_resolved:
+            return
+        self._values[i] = value
+        self._total_resolved += 1
+        self._in_flight -= 1
+        if not self._is_iterating:
+            self._iterate_next()
+
+    def _promise_rejected(self, reason, i=None):
+        self._iterator = None
+        return super(MapPromiseList, self)._promise_rejected(reason, i)
+
+
+class SettledResult(namedtuple('SettledResult', ['state', 'value'])):
+    """
+    The outcome of a promise, value is the reason when it was rejected.
+    """
+
+    __slots__ = ()
+
+    @property
+    def is_fulfilled(self):
+        from .promise import STATE_FULFILLED
+        return self.state == STATE_FULFILLED
+
+    @property
+    def is_rejected(self):
+        from .promise import STATE_REJECTED
+        return self.state == STATE_REJECTED
+
+
+class SettledPromiseList(PromiseList):
+    """
+    Waits for every value to settle, recording each outcome as a
+    SettledResult instead of rejecting on the first failure.
+    """
+
+    __slots__ = ()
+
+    def _promise_fulfilled(self, value, i):
+        from .promise import STATE_FULFILLED
+        return self._promise_settled(SettledResult(STATE_FULFILLED, value), i)
+
+    def _promise_rejected(self, reason, i=None):
+        from .promise import STATE_REJECTED
+        return self._promise_settled(SettledResult(STATE_REJECTED, reason), i)
+
+    def _promise_settled(self, result, i):
+        if self.is_resolved:
+            return
+        self._values[i] = result
+        self._total_resolved += 1
+        if self._total_resolved >= self._length and not self._is_iterating:
+            self._resolve_values()
+            return True
+        return False
+
+
+class RacePromiseList(PromiseList):
+    """
+    Settles like the first value to settle, then removes its callbacks
+    from the values still pending so they don't keep the list alive.
+    """
+
+    __slots__ = ()
+
+    _detaches = True
+
+    def _promise_fulfilled(self, value, i):
+        if self.is_resolved:
+            return
+        self._detach()
+        self._resolve(value)
+        return True
+
+    def _promise_rejected(self, reason, i=None):
+        if self.is_resolved:
+            return
+        self._detach()
+        self._reject(reason)
+        return True
+
+    def _resolve_values(self):
+        # Only reached without values, an empty race never settles
+        pass
+
+    def _detach(self):
+        Promise = self._promise_class
+        promise_fulfilled = self._promise_fulfilled
+        promise_rejected = self._promise_rejected
+        subscriptions = self._subscriptions
+        # Pending values are kept in their slot until they settle
+        for i, value in enumerate(self._values):
+            if isinstance(value, Promise):
+                value._unsubscribe(promise_fulfilled, promise_rejected, subscriptions.get(i))
+
+
+class AnyPromiseList(RacePromiseList):
+    """
+    Fulfills with the first value to be fulfilled. Rejections are only
+    recorded, if every value is rejected it rejects with all of them.
+    """
+
+    __slots__ = ()
+
+    def _promise_rejected(self, reason, i=None):
+        if self.is_resolved:
+            return
+        self._values[i] = reason
+        self._total_resolved += 1
+        if self._total_resolved >= self._length and not self._is_iterating:
+            self._resolve_values()
+            return True
+        return False
+
+    def _resolve_values(self):
+        from .promise import AggregateError
+        self._reject(AggregateError(self._values))
@@ -1,4 +1,9 @@
-from threading import Thread
+from functools import partial
+from threading import Thread, Lock, local
+from multiprocessing import cpu_count
+
+from .compat import Queue, Full, get_event_loop, get_running_loop
+from .timer import default_timer
 
 
 class SyncScheduler(object):
@@ -8,8 +13,140 @@ class SyncScheduler(object):
         except:
             pass
 
+    def call_later(self, delay, fn):
+        # The shared timer thread only hands fn over to a bounded pool once
+        # it's due, so a slow fn or its handlers can't hold back other
+        # timers, and a burst of due timers doesn't start a thread each
+        return default_timer.call_later(delay, partial(delayed_call_pool.call, fn))
+
 
 class ThreadScheduler(object):
     def call(self, fn):
         thread = Thread(target=fn)
         thread.start()
+
+    def call_later(self, delay, fn):
+        return default_timer.call_later(delay, partial(self.call, fn))
+
+
+class AsyncioScheduler(object):
+    """
+    Runs the scheduled calls as callbacks of an asyncio event loop,
+    so trampoline drains happen between loop iterations.
+    """
+
+    # Calls from other threads run on the loop's thread, so callbacks
+    # handed over to a trampoline can be scheduled right away
+    runs_in_loop_thread = True
+
+    def __init__(self, loop=None):
+        self.loop = loop or get_event_loop()
+
+    def _in_loop(self):
+        return get_running_loop() is self.loop
+
+    def call(self, fn):
+        if self._in_loop():
+            self.loop.call_soon(fn)
+        else:
+            self.loop.call_soon_threadsafe(fn)
+
+    def call_later(self, delay, fn):
+        if self._in_loop():
+            return self.loop.call_later(delay, fn)
+        # loop.call_later is not thread safe, the shared timer
+        # hands fn over to the loop once it is due
+        return default_timer.call_later(delay, partial(self.call, fn))
+
+
+class ThreadPoolScheduler(object):
+    """
+    Runs the scheduled calls on a fixed pool of worker threads.
+
+    At most max_queue_size calls wait for a worker (0 means unbounded),
+    call() blocks once the queue is full. Calls made from the workers
+    themselves run inline instead of blocking, so a full queue can't
+    deadlock the pool.
+    """
+
+    def __init__(self, max_workers=None, max_queue_size=0):
+        if max_workers is None:
+            max_workers = (cpu_count() or 1) * 5
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+
+        self.max_workers = max_workers
+        self._work_queue = Queue(max_queue_size)
+        self._threads = []  # type: list
+        self._local = local()
+        self._shutdown = False
+        self._lock = Lock()
+
+    def call(self, fn):
+        if self._shutdown:
+            raise RuntimeError("Cannot schedule new calls after shutdown")
+
+        if len(self._threads) < self.max_workers:
+            self._adjust_thread_count()
+
+        if getattr(self._local, 'is_worker', False):
+            try:
+                self._work_queue.put_nowait(fn)
+            except Full:
+                self._run(fn)
+        else:
+            self._work_queue.put(fn)
+
+    def call_later(self, delay, fn):
+        # The timer thread only hands fn over to the workers
+        return default_timer.call_later(delay, partial(self.call, fn))
+
+    def _adjust_thread_count(self):
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = Thread(target=self._worker)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        self._local.is_worker = True
+        work_queue = self._work_queue
+        while True:
+            fn = work_queue.get()
+            try:
+                if fn is None:
+                    return
+                self._run(fn)
+            finally:
+                work_queue.task_done()
+
+    def _run(self, fn):
+        try:
+            fn()
+        except:
+            pass
+
+    def join(self):
+        """
+        Block until every call scheduled so far has run.
+        """
+        self._work_queue.join()
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting calls and stop the workers once the queued
+        calls have run.
+        """
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._work_queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+# Runs the due delayed calls of every SyncScheduler
+delayed_call_pool = ThreadPoolScheduler()
@@ -0,0 +1,85 @@
+from heapq import heappush, heappop
+from itertools import count
+from threading import Condition, Lock, Thread
+
+from typing import Callable, List, Tuple  # flake8: noqa
+
+from .compat import monotonic
+
+
+class TimerHandle(object):
+
+    __slots__ = ('deadline', 'fn', 'cancelled')
+
+    def __init__(self, deadline, fn):
+        self.deadline = deadline
+        self.fn = fn  # type: Callable
+        self.cancelled = False
+
+    def cancel(self):
+        # The heap entry is dropped lazily once its deadline passes,
+        # releasing fn now frees whatever it references
+        self.cancelled = True
+        self.fn = None
+
+
+class TimerQueue(object):
+    """
+    Runs delayed calls from a single daemon thread.
+    Pending calls are kept in a heap ordered by deadline, so every
+    timer costs one heap entry instead of a thread.
+    """
+
+    def __init__(self):
+        self._heap = []  # type: List[Tuple[float, int, TimerHandle]]
+        self._counter = count()
+        self._condition = Condition(Lock())
+        self._thread = None  # type: Thread
+
+    def __len__(self):
+        return len(self._heap)
+
+    def call_later(self, delay, fn):
+        # type: (float, Callable) -> TimerHandle
+        timer = TimerHandle(monotonic() + delay, fn)
+        with self._condition:
+            heappush(self._heap, (timer.deadline, next(self._counter), timer))
+            if self._thread is None:
+                self._thread = Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            elif self._heap[0][2] is timer:
+                # The earliest deadline changed, wake the thread up
+                self._condition.notify()
+        return timer
+
+    def _next_timer(self):
+        heap = self._heap
+        with self._condition:
+            while True:
+                if not heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, timer = heap[0]
+                if timer.cancelled:
+                    heappop(heap)
+                    continue
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    heappop(heap)
+                    return timer
+                self._condition.wait(timeout)
+
+    def _run(self):
+        while True:
+            timer = self._next_timer()
+            fn = timer.fn
+            if fn is None:
+                continue
+            try:
+                fn()
+            except:
+                pass
+
+
+default_timer = TimerQueue()
@@ -6,3 +6,4 @@ if version_info[:2] < (3, 4):
 if version_info[:2] < (3, 5):
     collect_ignore.append('test_awaitable_35.py')
     collect_ignore.append('test_dataloader_awaitable_35.py')
+    collect_ignore.append('test_scheduler_asyncio_35.py')
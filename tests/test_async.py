@@ -0,0 +1,314 @@
+import sys
+from functools import partial
+from threading import Event, Thread, current_thread
+from time import sleep
+
+from promise import (
+    Promise,
+    get_async_instance,
+    get_default_scheduler,
+    set_default_scheduler,
+    SyncScheduler,
+    ThreadPoolScheduler,
+)
+from promise.async_ import Async
+from promise.context import Context
+
+
+class DeferredScheduler(object):
+    def __init__(self):
+        self.calls = []
+
+    def call(self, fn):
+        self.calls.append(fn)
+
+    def run(self):
+        calls = self.calls
+        self.calls = []
+        for fn in calls:
+            fn()
+
+
+def test_drains_normal_queue_before_late_queue():
+    scheduler = DeferredScheduler()
+    async_ = Async(scheduler)
+    calls = []
+
+    async_.invoke_later(lambda: calls.append('late'), None)
+    async_.invoke(lambda: calls.append('normal'), None)
+    assert len(scheduler.calls) == 1
+
+    scheduler.run()
+    assert calls == ['normal', 'late']
+    assert not async_.normal_queue
+    assert not async_.late_queue
+
+
+def test_invoke_threadsafe_runs_in_next_drain():
+    scheduler = DeferredScheduler()
+    async_ = Async(scheduler)
+    calls = []
+
+    async_.invoke(lambda: calls.append('normal'), None)
+
+    def queue_from_thread():
+        async_.invoke_threadsafe(lambda: calls.append('handoff'))
+
+    thread = Thread(target=queue_from_thread)
+    thread.start()
+    thread.join()
+    assert calls == []
+
+    scheduler.run()
+    assert calls == ['normal', 'handoff']
+    assert not async_.handoff_queue
+
+
+def run_in_thread(fn):
+    result = []
+    thread = Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_each_thread_has_its_own_trampoline():
+    main_instance = get_async_instance()
+    assert get_async_instance() is main_instance
+
+    thread_instance = run_in_thread(get_async_instance)
+    assert isinstance(thread_instance, Async)
+    assert thread_instance is not main_instance
+
+
+def test_callbacks_drain_in_the_settling_thread():
+    p = Promise()
+    threads = []
+    child = p.then(lambda v: threads.append(current_thread()))
+
+    thread = Thread(target=p.do_resolve, args=(1, ))
+    thread.start()
+    thread.join()
+
+    child.get()
+    assert threads == [thread]
+
+
+def test_set_default_scheduler_applies_to_all_threads():
+    scheduler = get_default_scheduler()
+    thread_instance = run_in_thread(get_async_instance)
+    new_scheduler = DeferredScheduler()
+    try:
+        set_default_scheduler(new_scheduler)
+        assert thread_instance.schedule is new_scheduler
+        assert run_in_thread(get_default_scheduler) is new_scheduler
+    finally:
+        set_default_scheduler(scheduler)
+
+
+def test_invoke_threadsafe_from_owner_thread():
+    scheduler = DeferredScheduler()
+    async_ = Async(scheduler)
+    calls = []
+
+    async_.invoke_threadsafe(lambda: calls.append('owner'))
+    assert not async_.handoff_queue
+
+    scheduler.run()
+    assert calls == ['owner']
+
+
+def test_invoke_threadsafe_with_sync_scheduler():
+    async_ = Async(SyncScheduler())
+    threads = []
+
+    # The foreign thread only queues fn, it runs once the owner
+    # runs its handoffs
+    run_in_thread(lambda: async_.invoke_threadsafe(lambda: threads.append(current_thread())))
+    assert threads == []
+    assert not async_.is_tick_used
+
+    async_.run_handoffs()
+    assert threads == [current_thread()]
+    assert not async_.handoff_queue
+    assert not async_.is_handoff_scheduled
+
+
+def test_invoke_threadsafe_runs_while_owner_waits():
+    p = Promise()
+    threads = []
+
+    def hand_over():
+        owner.invoke_threadsafe(lambda: threads.append(current_thread()))
+        owner.invoke_threadsafe(partial(p.do_resolve, 1))
+
+    owner = get_async_instance()
+    thread = Thread(target=hand_over)
+    thread.start()
+    assert p.get(timeout=5) == 1
+    thread.join()
+    assert threads == [current_thread()]
+
+
+def test_invoke_threadsafe_runs_while_owner_waits_on_many():
+    p1, p2 = Promise(), Promise()
+    owner = get_async_instance()
+
+    thread = Thread(target=lambda: owner.invoke_threadsafe(partial(p1.do_resolve, 1)))
+    thread.start()
+    p2.do_resolve(2)
+    assert Promise.get_many([p1, p2], timeout=5) == [1, 2]
+    thread.join()
+
+
+def test_invoke_threadsafe_runs_on_context_exit():
+    threads = []
+    owner = get_async_instance()
+
+    def leave_context():
+        # Leaving a context in a handed over callback doesn't
+        # run the next one nested in it
+        with Context():
+            pass
+        threads.append(len(owner.handoff_queue))
+
+    def hand_over():
+        owner.invoke_threadsafe(lambda: threads.append(current_thread()))
+        owner.invoke_threadsafe(leave_context)
+        owner.invoke_threadsafe(lambda: threads.append(len(owner.handoff_queue)))
+
+    thread = Thread(target=hand_over)
+    thread.start()
+    thread.join()
+    assert threads == []
+
+    with Context():
+        assert threads == []
+    assert threads == [current_thread(), 1, 0]
+
+
+def test_invoke_threadsafe_with_thread_pool_scheduler():
+    scheduler = ThreadPoolScheduler(max_workers=2)
+    async_ = Async(scheduler)
+    threads = []
+    try:
+        run_in_thread(lambda: async_.invoke_threadsafe(lambda: threads.append(current_thread())))
+        scheduler.join()
+        # Nothing was handed to the workers
+        assert threads == []
+
+        async_.run_handoffs()
+        assert threads == [current_thread()]
+    finally:
+        scheduler.shutdown()
+
+
+def test_callback_added_while_a_worker_releases_the_tick():
+    scheduler = ThreadPoolScheduler(max_workers=1)
+    async_ = Async(scheduler)
+    releasing = Event()
+    calls = []
+    reset = async_.reset
+
+    def slow_reset():
+        # Widen the window between the worker's last look at the
+        # queue and releasing the tick
+        releasing.set()
+        sleep(0.05)
+        reset()
+
+    async_.reset = slow_reset
+    try:
+        async_.invoke(partial(calls.append, 1), None)
+        releasing.wait(5)
+        async_.reset = reset
+        async_.invoke(partial(calls.append, 2), None)
+        scheduler.join()
+        assert calls == [1, 2]
+        assert not async_.normal_queue
+        assert not async_.is_tick_used
+    finally:
+        scheduler.shutdown()
+
+
+def test_tick_budget_max_callbacks():
+    scheduler = DeferredScheduler()
+    async_ = Async(scheduler)
+    async_.set_tick_budget(max_callbacks=2)
+    calls = []
+
+    for i in range(5):
+        async_.invoke(partial(calls.append, i), None)
+
+    scheduler.run()
+    assert calls == [0, 1]
+    assert async_.is_tick_used
+    assert len(scheduler.calls) == 1
+
+    scheduler.run()
+    scheduler.run()
+    assert calls == [0, 1, 2, 3, 4]
+    assert not async_.is_tick_used
+    assert async_.ticks == 3
+    assert async_.budget_exhausted == 2
+
+
+def test_tick_budget_max_time():
+    scheduler = DeferredScheduler()
+    async_ = Async(scheduler)
+    async_.set_tick_budget(max_time=0)
+    calls = []
+
+    for i in range(3):
+        async_.invoke(partial(calls.append, i), None)
+    async_.invoke_later(partial(calls.append, 'late'), None)
+
+    while scheduler.calls:
+        scheduler.run()
+
+    # Every tick runs at least one callback
+    assert calls == [0, 1, 2, 'late']
+    assert async_.ticks == 3
+    assert async_.budget_exhausted == 2
+
+
+def test_tick_budget_with_sync_scheduler_large_fan_out():
+    async_ = get_async_instance()
+    async_.set_tick_budget(max_callbacks=10)
+    try:
+        p = Promise()
+        children = [p.then(lambda v: v).then(lambda v: v) for _ in range(20000)]
+        p.do_resolve(1)
+
+        # The slices run one after another instead of recursing
+        assert not any(child.is_pending for child in children)
+        assert not async_.is_tick_used
+        assert async_.draining_thread is None
+        assert Promise.resolve(2).then(lambda v: v).get() == 2
+    finally:
+        async_.set_tick_budget()
+
+
+def test_tick_budget_with_thread_pool_scheduler():
+    scheduler = ThreadPoolScheduler(max_workers=4)
+    async_ = Async(scheduler)
+    async_.set_tick_budget(max_callbacks=1)
+    calls = []
+    # Switch threads often, so the next slice usually starts on another
+    # worker while the previous drain is still returning
+    switch_interval = getattr(sys, 'getswitchinterval', None)
+    interval = switch_interval and switch_interval()
+    if switch_interval:
+        sys.setswitchinterval(1e-6)
+    try:
+        for round in range(5000):
+            for i in range(3):
+                async_.invoke(partial(calls.append, i), None)
+            scheduler.join()
+            assert len(calls) == 3 * (round + 1)
+            assert not async_.is_tick_used
+            assert async_.draining_thread is None
+    finally:
+        if switch_interval:
+            sys.setswitchinterval(interval)
+        scheduler.shutdown()
@@ -1,6 +1,11 @@
-from pytest import raises
+from pytest import raises, importorskip
+import sys
 import time
-from promise import Promise, promisify, is_thenable
+from threading import Event, Lock
+from promise import (Promise, promisify, is_thenable, async_instance,
+                     get_default_scheduler, set_default_scheduler)
+from promise.scheduler import ThreadScheduler, ThreadPoolScheduler
+from promise.dataloader import DataLoader, LRUCache
 
 
 def test_benchmark_promise_creation(benchmark):
@@ -112,3 +117,334 @@ def test_benchmark_promise_all_promise(benchmark):
 
     assert isinstance(result, Promise)
     assert result.get() == list(range(1000))
+
+
+def _bytes_per_promise(create, n=10000):
+    tracemalloc = importorskip('tracemalloc')
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        promises = [create() for _ in range(n)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # Discount the list that keeps the promises alive
+    return float(after - before - sys.getsizeof(promises)) / n
+
+
+def test_benchmark_memory_pending_promise(benchmark):
+    size = _bytes_per_promise(Promise)
+    benchmark.extra_info['bytes_per_promise'] = size
+
+    result = benchmark(Promise)
+    assert result.is_pending
+
+
+def test_benchmark_memory_fulfilled_promise(benchmark):
+    def create_promise():
+        return Promise.resolve(True)
+
+    size = _bytes_per_promise(create_promise)
+    benchmark.extra_info['bytes_per_promise'] = size
+
+    result = benchmark(create_promise)
+    assert result.is_fulfilled
+
+
+def test_benchmark_memory_chained_promise(benchmark):
+    identity = lambda v: v
+    parents = iter([Promise() for _ in range(10000)])
+
+    def chain_promise():
+        return next(parents).then(identity)
+
+    # Only the child promise and its callback slot are measured
+    size = _bytes_per_promise(chain_promise)
+    benchmark.extra_info['bytes_per_promise'] = size
+
+    def create_promise():
+        return Promise().then(identity)
+
+    result = benchmark(create_promise)
+    assert result.is_pending
+
+
+def test_benchmark_promise_fan_out(benchmark):
+    identity = lambda v: v
+
+    def fan_out():
+        p = Promise()
+        children = [p.then(identity) for _ in range(500)]
+        p.do_resolve(True)
+        return children[-1]
+
+    result = benchmark(fan_out)
+    assert result.get() == True
+
+
+def _then_on_settled(benchmark):
+    identity = lambda v: v
+    resolved = Promise.resolve(True)
+
+    def create_promise():
+        return resolved.then(identity)
+
+    result = benchmark(create_promise)
+    assert result.get() == True
+
+
+def test_benchmark_then_settled_trampoline(benchmark):
+    _then_on_settled(benchmark)
+
+
+def test_benchmark_then_settled_fast_path(benchmark):
+    async_instance.enable_fast_path()
+    try:
+        _then_on_settled(benchmark)
+    finally:
+        async_instance.disable_fast_path()
+
+
+def test_benchmark_promise_settle_throughput(benchmark):
+    identity = lambda v: v
+
+    def settle_promises():
+        promises = [Promise() for _ in range(1000)]
+        children = [p.then(identity) for p in promises]
+        for p in promises:
+            p.do_resolve(True)
+        return children[-1]
+
+    result = benchmark(settle_promises)
+    assert result.get() == True
+
+
+def _schedule_calls(scheduler, n=100):
+    done = Event()
+    remaining = [n]
+    lock = Lock()
+
+    def call():
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+
+    for _ in range(n):
+        scheduler.call(call)
+    done.wait()
+
+
+def test_benchmark_thread_scheduler(benchmark):
+    scheduler = ThreadScheduler()
+    benchmark(_schedule_calls, scheduler)
+
+
+def test_benchmark_thread_pool_scheduler(benchmark):
+    scheduler = ThreadPoolScheduler(max_workers=4)
+    try:
+        benchmark(_schedule_calls, scheduler)
+    finally:
+        scheduler.shutdown()
+
+
+def test_benchmark_promise_deep_follow_chain(benchmark):
+    def create_chain():
+        first = last = Promise()
+        for _ in range(1000):
+            followee = Promise()
+            last.do_resolve(followee)
+            last = followee
+        for _ in range(100):
+            first.is_pending
+        last.do_resolve(True)
+        return first
+
+    result = benchmark(create_chain)
+    assert result.get() == True
+
+
+def test_benchmark_promise_all_get(benchmark):
+    values = [Promise.resolve(i) for i in range(1000)]
+
+    def get_values():
+        return Promise.all(values).get()
+
+    result = benchmark(get_values)
+    assert result == list(range(1000))
+
+
+def test_benchmark_promise_get_many(benchmark):
+    values = [Promise.resolve(i) for i in range(1000)]
+
+    def get_values():
+        return Promise.get_many(values)
+
+    result = benchmark(get_values)
+    assert result == list(range(1000))
+
+
+def _promise_all_pending(benchmark, size):
+    def create_promise():
+        values = [Promise() for _ in range(size)]
+        promise = Promise.all(values)
+        for i, p in enumerate(values):
+            p.do_resolve(i)
+        return promise
+
+    result = benchmark(create_promise)
+    assert result.get() == list(range(size))
+
+
+def test_benchmark_promise_all_pending_1k(benchmark):
+    _promise_all_pending(benchmark, 1000)
+
+
+def test_benchmark_promise_all_pending_100k(benchmark):
+    _promise_all_pending(benchmark, 100000)
+
+
+def test_benchmark_promise_all_generator_100k(benchmark):
+    def create_promise():
+        values = [Promise() for _ in range(100000)]
+        promise = Promise.all(p for p in values)
+        for i, p in enumerate(values):
+            p.do_resolve(i)
+        return promise
+
+    result = benchmark(create_promise)
+    assert result.get() == list(range(100000))
+
+
+def test_benchmark_promise_map_concurrency_10k(benchmark):
+    def create_promise():
+        mapper = lambda x: Promise.resolve(None).then(lambda v: x)
+        return Promise.map(range(10000), mapper, concurrency=100).get()
+
+    result = benchmark(create_promise)
+    assert result == list(range(10000))
+
+
+def test_benchmark_promise_all_settled_100k(benchmark):
+    def create_promise():
+        values = [Promise() for _ in range(100000)]
+        promise = Promise.all_settled(values)
+        for i, p in enumerate(values):
+            p.do_resolve(i)
+        return promise
+
+    result = benchmark(create_promise)
+    assert [r.value for r in result.get()] == list(range(100000))
+
+
+def _race_slow_losers(benchmark, race):
+    losers = [Promise() for _ in range(10000)]
+
+    def create_promise():
+        winner = Promise()
+        promise = race([winner] + losers)
+        winner.do_resolve(1)
+        return promise.get()
+
+    result = benchmark(create_promise)
+    assert result == 1
+    # Every race detached itself, the losers don't pile up callbacks
+    assert all(loser._length == 0 for loser in losers)
+
+
+def test_benchmark_promise_race_slow_losers_10k(benchmark):
+    _race_slow_losers(benchmark, Promise.race)
+
+
+def test_benchmark_promise_any_slow_losers_10k(benchmark):
+    _race_slow_losers(benchmark, Promise.any)
+
+
+def _dataloader_cached_loads(benchmark, cache_map):
+    loader = DataLoader(Promise.resolve, cache_map=cache_map)
+    keys = list(range(1000))
+    loader.load_many(keys).get()
+
+    def load_cached():
+        return [loader.load(key) for key in keys]
+
+    result = benchmark(load_cached)
+    assert len(result) == 1000
+
+
+def test_benchmark_dataloader_cached_loads_dict(benchmark):
+    _dataloader_cached_loads(benchmark, {})
+
+
+def test_benchmark_dataloader_cached_loads_lru(benchmark):
+    _dataloader_cached_loads(benchmark, LRUCache(1000, ttl=60))
+
+
+def _dataloader_slow_chunks(benchmark, **options):
+    def fn(keys):
+        time.sleep(0.005)
+        return Promise.resolve(keys)
+
+    def load():
+        loader = DataLoader(fn, max_batch_size=10, batch_window_ms=1, **options)
+        return loader.load_many(list(range(80))).get()
+
+    # The batch window needs the drains to run off the timer thread
+    default_scheduler = get_default_scheduler()
+    scheduler = ThreadPoolScheduler(max_workers=2)
+    set_default_scheduler(scheduler)
+    try:
+        result = benchmark(load)
+    finally:
+        set_default_scheduler(default_scheduler)
+        scheduler.shutdown()
+    assert result == list(range(80))
+
+
+def test_benchmark_dataloader_slow_chunks_serial(benchmark):
+    _dataloader_slow_chunks(benchmark)
+
+
+def test_benchmark_dataloader_slow_chunks_concurrent(benchmark):
+    executor = ThreadPoolScheduler(max_workers=8)
+    _dataloader_slow_chunks(benchmark, batch_executor=executor, max_concurrent_batches=8)
+    executor.shutdown()
+
+
+def _dataloader_batch_10k(benchmark, batch_load_fn):
+    keys = list(range(10000))
+
+    @Promise.safe
+    def load():
+        loader = DataLoader(batch_load_fn)
+        return loader.load_many(keys).get()
+
+    result = benchmark(load)
+    assert result == keys
+
+
+def test_benchmark_dataloader_batch_list_10k(benchmark):
+    _dataloader_batch_10k(benchmark, Promise.resolve)
+
+
+def test_benchmark_dataloader_batch_dict_10k(benchmark):
+    _dataloader_batch_10k(benchmark, lambda keys: Promise.resolve({key: key for key in keys}))
+
+
+def test_benchmark_dataloader_duplicate_keys_without_cache(benchmark):
+    load_calls = []
+
+    def fn(keys):
+        load_calls.append(len(keys))
+        return Promise.resolve(keys)
+
+    keys = [i % 10 for i in range(500)]
+
+    @Promise.safe
+    def load():
+        loader = DataLoader(fn, cache=False)
+        return loader.load_many(keys).get()
+
+    result = benchmark(load)
+    assert result == keys
+    assert set(load_calls) == {10}
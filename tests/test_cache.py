@@ -0,0 +1,105 @@
+import sys
+from threading import Thread
+from time import sleep
+
+from pytest import raises
+
+from promise.cache import LRUCache
+
+
+def test_lru_cache_get_and_set():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    assert cache.get('a') == 1
+    assert cache['a'] == 1
+    assert 'a' in cache
+    assert cache.get('b') is None
+    assert cache.get('b', 2) == 2
+    assert len(cache) == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    # Using a makes b the least recently used entry
+    assert cache.get('a') == 1
+    cache['c'] = 3
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_lru_cache_overwrite_does_not_evict():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['a'] = 3
+    assert cache['a'] == 3
+    assert len(cache) == 2
+    assert cache.evictions == 0
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(2, ttl=0.01)
+    cache['a'] = 1
+    assert cache.get('a') == 1
+    sleep(0.02)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.expirations == 1
+
+
+def test_lru_cache_delete():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    del cache['a']
+    assert cache.pop('a') is None
+    with raises(KeyError):
+        cache['a']
+
+    cache['b'] = 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_invalid_size():
+    with raises(TypeError):
+        LRUCache(0)
+
+
+def test_lru_cache_shared_between_threads():
+    cache = LRUCache(8)
+    errors = []
+
+    def use_cache(offset):
+        try:
+            for i in range(20000):
+                key = (i + offset) % 16
+                if cache.get(key) is None:
+                    cache[key] = i
+                cache.pop((key + 1) % 16)
+        except Exception as e:
+            errors.append(e)
+
+    # Switch threads often, so lookups and evictions of a key interleave
+    switch_interval = getattr(sys, 'getswitchinterval', None)
+    interval = switch_interval and switch_interval()
+    if switch_interval:
+        sys.setswitchinterval(1e-6)
+    try:
+        threads = [Thread(target=use_cache, args=(n, )) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if switch_interval:
+            sys.setswitchinterval(interval)
+
+    assert errors == []
+    assert len(cache) <= 8
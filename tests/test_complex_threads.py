@@ -1,4 +1,5 @@
 from time import sleep
+from threading import Event, Thread, current_thread
 from concurrent.futures import ThreadPoolExecutor
 from promise import Promise
 from operator import mul
@@ -19,3 +20,134 @@ def promise_factorial(n):
 def test_factorial():
     p = promise_factorial(10)
     assert p.get() == 3628800
+
+
+def test_concurrent_then_and_resolve():
+    promises = [Promise() for _ in range(200)]
+    results = []
+    start = Event()
+
+    def subscribe(p):
+        start.wait()
+        for _ in range(20):
+            p.then(results.append)
+
+    def resolve(p, i):
+        start.wait()
+        p.do_resolve(i)
+
+    threads = [Thread(target=subscribe, args=(p, )) for p in promises]
+    threads += [Thread(target=resolve, args=(p, i)) for i, p in enumerate(promises)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    Promise.all([p.then(lambda v: v) for p in promises]).get()
+    # Callbacks may still be draining in other threads
+    for _ in range(100):
+        if len(results) == 4000:
+            break
+        sleep(.01)
+    assert sorted(results) == sorted(list(range(200)) * 20)
+
+
+def test_concurrent_handler_errors():
+    def raises(value):
+        raise Exception(value)
+
+    def reject(i):
+        return Promise.resolve(i).then(raises)
+
+    promises = list(executor.map(reject, range(100)))
+    errors = Promise.all([p.catch(str) for p in promises]).get()
+    assert errors == [str(i) for i in range(100)]
+
+
+def test_is_pending_while_another_thread_starts_following():
+    observed = []
+
+    class ObservedPromise(Promise):
+        def _set_followee(self, promise):
+            # Another thread reads the chain, without the lock, right
+            # in the middle of the switch to following
+            thread = Thread(target=lambda: observed.append(self.is_pending))
+            thread.start()
+            thread.join()
+            super(ObservedPromise, self)._set_followee(promise)
+
+    p = ObservedPromise()
+    followee = Promise()
+    p.do_resolve(followee)
+    assert observed == [True]
+    followee.do_resolve(1)
+    assert p.get() == 1
+
+
+def test_concurrent_is_pending_and_follow():
+    errors = []
+
+    for _ in range(200):
+        p = Promise()
+
+        def poll():
+            try:
+                for _ in range(200):
+                    p.is_pending
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=poll) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        p.do_resolve(Promise())
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+
+
+def test_path_compression_while_the_chain_moves_on():
+    is_following = Promise._is_following
+    paused, resume = Event(), Event()
+    reader = None
+
+    class PausedPromise(Promise):
+        # Pauses the reading thread right after it found the end of the
+        # chain, like a thread switch would
+        @property
+        def _is_following(self):
+            value = is_following.__get__(self, Promise)
+            if self is c and not value and current_thread() is reader:
+                paused.set()
+                resume.wait()
+            return value
+
+        @_is_following.setter
+        def _is_following(self, value):
+            is_following.__set__(self, value)
+
+    a, b, c, d = (PausedPromise() for _ in range(4))
+    # a -> b -> c
+    a.do_resolve(b)
+    b.do_resolve(c)
+
+    targets = []
+    reader = Thread(target=lambda: targets.append(a._target()))
+    reader.start()
+    assert paused.wait(5)
+
+    # Meanwhile c follows d, b is compressed to d and d is fulfilled
+    c.do_resolve(d)
+    assert b._target() is d
+    d.do_resolve('value')
+
+    resume.set()
+    reader.join()
+    assert targets == [c]
+    # Nothing past c was rewritten
+    assert d._rejection_handler0 == 'value'
+    assert a._target() is d
+    assert a.get() == 'value'
+    assert repr(d) == "<Promise at {} fulfilled with 'value'>".format(hex(id(d)))
@@ -6,15 +6,16 @@ from promise import (
 from mock import Mock
 from promise.context import (
     Context,
-    context_stack
+    get_context_stack
 )
 import time
+from threading import Thread, current_thread
 
 
 def test_basic():
     assert Context.peek_context() == None
     with Context() as c:
-        assert context_stack == [c]
+        assert get_context_stack() == [c]
         assert Context.peek_context() == c
         assert c._parent == None
 
@@ -23,7 +24,7 @@ def test_basic():
 
 def test_concatenated():
     with Context() as c1, Context() as c2:
-        assert context_stack == [c1, c2]
+        assert get_context_stack() == [c1, c2]
         assert Context.peek_context() == c2
         assert c1._parent == None
         assert c2._parent == c1
@@ -54,6 +55,23 @@ def test_promise_with_context_3():
         p.then(on_resolved)
         on_resolved.assert_not_called()
 
+
+def test_context_of_another_thread():
+    threads = []
+
+    def resolve_in_thread():
+        assert Context.peek_context() is None
+        Promise.resolve(1).then(lambda v: threads.append(current_thread()))
+        threads.append(Context.peek_context())
+
+    with Context() as c:
+        thread = Thread(target=resolve_in_thread)
+        thread.start()
+        thread.join()
+        # The other thread's handler didn't wait for this context
+        assert threads == [thread, None]
+        assert get_context_stack() == [c]
+
 class Counter:
     """
     A helper class with some side effects
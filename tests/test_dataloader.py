@@ -1,7 +1,13 @@
-from pytest import raises
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread, current_thread
+from time import sleep, time
 
-from promise import Promise
-from promise.dataloader import DataLoader
+from pytest import raises, fixture
+
+from promise import Promise, get_default_scheduler, set_default_scheduler
+from promise.dataloader import DataLoader, LRUCache
+from promise.scheduler import ThreadPoolScheduler
 
 
 def id_loader(**options):
@@ -192,6 +198,24 @@ def test_clears_all_values_in_loader():
     assert load_calls == [['A', 'B'], ['A', 'B']]
 
 
+@Promise.safe
+def test_bounded_cache_map():
+    identity_loader, load_calls = id_loader(cache_map=LRUCache(2))
+
+    assert identity_loader.load_many([1, 2, 3]).get() == [1, 2, 3]
+    assert load_calls == [[1, 2, 3]]
+    assert identity_loader._promise_cache.evictions == 1
+
+    # 1 was evicted and is loaded again, 3 is still cached
+    assert identity_loader.load_many([1, 3]).get() == [1, 3]
+    assert load_calls == [[1, 2, 3], [1]]
+
+    identity_loader.clear(2)
+    identity_loader.clear_all()
+    assert isinstance(identity_loader._promise_cache, LRUCache)
+    assert len(identity_loader._promise_cache) == 0
+
+
 @Promise.safe
 def test_allows_priming_the_cache():
     identity_loader, load_calls = id_loader()
@@ -347,6 +371,304 @@ def test_catches_error_if_loader_resolver_fails():
     assert str(exc_info.value) == "Data loader batch_load_fn function raised an Exception: Exception('AOH!',)"
 
 
+@fixture
+def pool_scheduler():
+    # Batch windows and executors also work when the trampoline
+    # is drained on a thread pool instead of the calling thread
+    default_scheduler = get_default_scheduler()
+    scheduler = ThreadPoolScheduler(max_workers=4)
+    set_default_scheduler(scheduler)
+    yield scheduler
+    set_default_scheduler(default_scheduler)
+    scheduler.shutdown()
+
+
+def test_batch_window_with_sync_scheduler():
+    threads = []
+
+    def fn(keys):
+        threads.append(current_thread())
+        return Promise.resolve(keys)
+
+    identity_loader = DataLoader(fn, batch_window_ms=20)
+    promise1 = identity_loader.load(1)
+    sleep(0.01)
+    promise2 = identity_loader.load(2)
+
+    # The batch waits for this thread to ask for it
+    assert Promise.all([promise1, promise2]).get() == [1, 2]
+    assert threads == [current_thread()]
+
+
+def test_batch_executor_with_sync_scheduler():
+    load_threads = []
+    handler_threads = []
+
+    def fn(keys):
+        load_threads.append(current_thread())
+        return Promise.resolve(keys)
+
+    executor = ThreadPoolScheduler(max_workers=2)
+    identity_loader = DataLoader(fn, max_batch_size=1, batch_executor=executor, max_concurrent_batches=1)
+    promises = [
+        identity_loader.load(key).then(lambda v: handler_threads.append(current_thread()) or v)
+        for key in range(3)
+    ]
+
+    # The batches are loaded on the executor, and handed back
+    # to this thread while it waits
+    assert Promise.get_many(promises) == [0, 1, 2]
+    assert len(load_threads) == 3
+    assert current_thread() not in load_threads
+    assert handler_threads == [current_thread()] * 3
+    assert identity_loader._batches_in_flight == 0
+    executor.shutdown()
+
+
+def test_batch_executor_from_concurrent_futures():
+    executor = ThreadPoolExecutor(max_workers=2)
+    identity_loader, load_calls = id_loader(max_batch_size=2, batch_executor=executor)
+
+    assert identity_loader.load_many([1, 2, 3]).get(5) == [1, 2, 3]
+    assert sorted(sum(load_calls, [])) == [1, 2, 3]
+    executor.shutdown()
+
+
+def test_batch_executor_needs_a_call_or_submit():
+    with raises(TypeError) as exc_info:
+        id_loader(batch_executor=object())
+
+    assert str(exc_info.value).startswith(
+        'DataLoader batch_executor must have a call() or submit() method'
+    )
+
+
+def test_batch_window_joins_loads_made_apart(pool_scheduler):
+    identity_loader, load_calls = id_loader(batch_window_ms=100)
+
+    promise1 = identity_loader.load(1)
+    sleep(0.02)
+    promise2 = identity_loader.load(2)
+
+    assert Promise.all([promise1, promise2]).get() == [1, 2]
+    assert load_calls == [[1, 2]]
+
+
+def test_batch_window_joins_loads_from_threads(pool_scheduler):
+    identity_loader, load_calls = id_loader(batch_window_ms=100)
+    promises = []
+
+    def load(key):
+        promises.append(identity_loader.load(key))
+
+    threads = [Thread(target=load, args=(key,)) for key in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(Promise.all(promises).get()) == list(range(5))
+    assert len(load_calls) == 1
+    assert sorted(load_calls[0]) == list(range(5))
+
+
+def test_batch_window_slides_until_max_wait(pool_scheduler):
+    identity_loader, load_calls = id_loader(batch_window_ms=60, max_batch_wait_ms=1000)
+
+    # Every load extends the window, so these end up in one batch
+    promises = []
+    for key in range(4):
+        promises.append(identity_loader.load(key))
+        sleep(0.02)
+
+    assert Promise.all(promises).get() == [0, 1, 2, 3]
+    assert load_calls == [[0, 1, 2, 3]]
+
+
+def test_batch_window_is_bounded_by_max_wait(pool_scheduler):
+    identity_loader, load_calls = id_loader(batch_window_ms=60, max_batch_wait_ms=60)
+
+    promises = []
+    for key in range(8):
+        promises.append(identity_loader.load(key))
+        sleep(0.02)
+
+    assert Promise.all(promises).get() == list(range(8))
+    assert len(load_calls) > 1
+    assert sum(load_calls, []) == list(range(8))
+
+
+def test_batch_window_shorter_max_wait():
+    identity_loader, load_calls = id_loader(batch_window_ms=300, max_batch_wait_ms=20)
+
+    start = time()
+    assert identity_loader.load(1).get(5) == 1
+    assert time() - start < 0.2
+    assert load_calls == [[1]]
+
+
+def test_batch_window_does_not_load_on_the_timer_thread(pool_scheduler):
+    threads = []
+
+    def fn(keys):
+        threads.append(current_thread())
+        sleep(0.3)
+        return Promise.resolve(keys)
+
+    def wait_for_timer():
+        start = time()
+        Promise.delay(0.05).get()
+        elapsed.append(time() - start)
+
+    elapsed = []
+    identity_loader = DataLoader(fn, batch_window_ms=10)
+    promise = identity_loader.load(1)
+    # A slow batch must not hold back the other timers
+    thread = Thread(target=wait_for_timer)
+    thread.start()
+    assert promise.get() == 1
+    thread.join()
+    assert elapsed[0] < 0.2
+
+    # The batch is loaded on the thread that opened it
+    assert threads == [current_thread()]
+
+
+def test_concurrent_batches_on_executor(pool_scheduler):
+    lock = Lock()
+    in_flight = {'current': 0, 'max': 0}
+    threads = set()
+    load_calls = []
+
+    def fn(keys):
+        with lock:
+            in_flight['current'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            threads.add(current_thread())
+            load_calls.append(keys)
+        sleep(0.02)
+        with lock:
+            in_flight['current'] -= 1
+        return Promise.resolve(keys)
+
+    executor = ThreadPoolScheduler(max_workers=4)
+    # The batch window collects every load into a single queue
+    identity_loader = DataLoader(fn, max_batch_size=2, batch_window_ms=20,
+                                 batch_executor=executor, max_concurrent_batches=2)
+
+    values = identity_loader.load_many(list(range(8))).get()
+    assert values == list(range(8))
+    assert sorted(load_calls) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert in_flight['max'] == 2
+    assert current_thread() not in threads
+    assert identity_loader._batches_in_flight == 0
+    executor.shutdown()
+
+
+def test_concurrent_batch_failure_frees_its_slot(pool_scheduler):
+    def fn(keys):
+        if 0 in keys:
+            raise Exception("Batch failed")
+        return Promise.resolve(keys)
+
+    executor = ThreadPoolScheduler(max_workers=1)
+    identity_loader = DataLoader(fn, max_batch_size=1, batch_executor=executor, max_concurrent_batches=1)
+
+    with raises(Exception) as exc_info:
+        identity_loader.load(0).get()
+
+    assert "Batch failed" in str(exc_info.value)
+    assert identity_loader._batches_in_flight == 0
+
+    # The slot is free again once the loads are, switch threads often
+    # so the pool workers interleave with the waiting thread
+    switch_interval = getattr(sys, 'getswitchinterval', None)
+    interval = switch_interval and switch_interval()
+    if switch_interval:
+        sys.setswitchinterval(1e-6)
+    try:
+        for key in range(1, 100):
+            assert identity_loader.load(key).get(5) == key
+            assert identity_loader._batches_in_flight == 0
+    finally:
+        if switch_interval:
+            sys.setswitchinterval(interval)
+    executor.shutdown()
+
+
+@Promise.safe
+def test_batch_load_fn_returning_a_dict():
+    load_calls = []
+
+    def fn(keys):
+        load_calls.append(keys)
+        # Unordered, and without the keys that don't exist
+        return Promise.resolve({key: key * 2 for key in reversed(keys) if key != 3})
+
+    loader = DataLoader(fn, missing_key_default=None)
+    assert loader.load_many([1, 2, 3]).get() == [2, 4, None]
+    assert load_calls == [[1, 2, 3]]
+
+
+@Promise.safe
+def test_batch_load_fn_returning_a_dict_rejects_missing_keys():
+    error = Exception("Error")
+
+    def fn(keys):
+        return Promise.resolve({1: 1, 2: error})
+
+    loader = DataLoader(fn)
+    promise1, promise2, promise3 = loader.load(1), loader.load(2), loader.load(3)
+    assert promise1.get() == 1
+
+    with raises(Exception) as exc_info:
+        promise2.get()
+    assert exc_info.value is error
+
+    with raises(KeyError) as exc_info:
+        promise3.get()
+    assert "did not return a value for the key: 3." in str(exc_info.value)
+
+
+@Promise.safe
+def test_dedupes_keys_in_a_batch_without_cache():
+    identity_loader, load_calls = id_loader(cache=False)
+
+    promises = [identity_loader.load(key) for key in [1, 2, 1, 1, 2, 3]]
+    assert promises[0] is not promises[2]
+    assert Promise.all(promises).get() == [1, 2, 1, 1, 2, 3]
+    assert load_calls == [[1, 2, 3]]
+
+
+@Promise.safe
+def test_dedupes_keys_by_cache_key_without_cache():
+    identity_loader, load_calls = id_loader(cache=False, get_cache_key=lambda key: key.lower())
+
+    assert Promise.all([identity_loader.load('A'), identity_loader.load('a')]).get() == ['A', 'A']
+    assert load_calls == [['A']]
+
+
+@Promise.safe
+def test_deduped_keys_share_rejections_without_cache():
+    error = Exception("Error")
+    loader = DataLoader(lambda keys: Promise.resolve([error for key in keys]), cache=False)
+
+    promise1, promise2 = loader.load(1), loader.load(1)
+    for promise in (promise1, promise2):
+        with raises(Exception) as exc_info:
+            promise.get()
+        assert exc_info.value is error
+
+
+@Promise.safe
+def test_unhashable_keys_are_not_deduped_without_cache():
+    identity_loader, load_calls = id_loader(cache=False)
+
+    values = Promise.all([identity_loader.load([1]), identity_loader.load([1])]).get()
+    assert values == [[1], [1]]
+    assert load_calls == [[[1], [1]]]
+
+
 # @Promise.safe
 # def test_can_call_a_loader_from_a_loader():
 #     deep_loader, deep_load_calls = id_loader()
@@ -1,6 +1,7 @@
 # This exercises some capabilities above and beyond
 # the Promises/A+ test suite
-from time import sleep
+import sys
+from time import sleep, time
 from pytest import raises, fixture
 
 from threading import Event
@@ -8,7 +9,10 @@ from promise import (
     Promise,
     is_thenable,
     promisify,
-    promise_for_dict as free_promise_for_dict, )
+    promise_for_dict as free_promise_for_dict,
+    async_instance,
+    TimeoutError, )
+from promise.context import Context
 from concurrent.futures import Future
 from threading import Thread
 
@@ -162,6 +166,91 @@ def test_wait_timeout():
     assert p1.is_fulfilled
 
 
+def test_wait_timeout_error():
+    p1 = Promise()
+    with raises(TimeoutError):
+        p1._wait(timeout=0.01)
+
+
+def test_wait_adds_no_callbacks():
+    p1 = Promise()
+    t = Thread(target=p1._wait)
+    t.start()
+    sleep(0.01)
+    assert p1._length == 0
+    assert p1._has_waiters
+    p1.do_resolve(5)
+    t.join()
+    assert p1.get() == 5
+
+
+def test_wait_follows_resolution():
+    p1 = Promise()
+    p2 = df(5, 0.05)
+    DelayedFulfill(0.01, p1, p2).start()
+    assert p1.get(1) == 5
+
+
+def test_wait_many_threads():
+    p1 = df(5, 0.05)
+    results = []
+    threads = [Thread(target=lambda: results.append(p1.get(1))) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [5] * 20
+
+
+# TIMEOUT
+def test_timeout_rejects_pending_promise():
+    p1 = df(5, 0.2)
+    p2 = p1.timeout(0.01)
+    with raises(TimeoutError) as exc_info:
+        p2.get(1)
+    assert str(exc_info.value) == "Promise timed out after 0.01 seconds"
+    assert p1.get() == 5
+
+
+def test_timeout_fulfilled_in_time():
+    p1 = df(5, 0.01)
+    p2 = p1.timeout(1)
+    assert p2.get() == 5
+
+
+def test_timeout_rejected_in_time():
+    p1 = dr(Exception("Error"), 0.01)
+    p2 = p1.timeout(1)
+    with raises(Exception) as exc_info:
+        p2.get()
+    assert str(exc_info.value) == "Error"
+
+
+def test_timeout_settled_promise():
+    p1 = Promise.resolve(5)
+    assert p1.timeout(0).get() == 5
+
+
+def test_timeout_detaches_from_pending_promise():
+    p1 = Promise()
+    p2 = p1.timeout(0.01)
+    with raises(TimeoutError):
+        p2.get(1)
+    # The timed out handlers are no longer referenced
+    assert p1._length == 0
+
+
+def test_timeout_handlers_do_not_hold_back_other_timers():
+    def slow(reason):
+        sleep(0.3)
+
+    Promise().timeout(0.01).catch(slow)
+    sleep(0.05)
+    start = time()
+    Promise.delay(0.02).get(1)
+    assert time() - start < 0.2
+
+
 # GET
 def test_get_when():
     p1 = df(5, 0.01)
@@ -560,6 +649,46 @@ def test_resolve_promise_subclass():
     assert m_p.get() == p.get()
 
 
+def test_promise_many_callbacks():
+    # More subscribers than the former 0xFFFF callback slots
+    p = Promise()
+    results = []
+    promises = [p.then(results.append) for _ in range(70000)]
+    p.do_resolve(1)
+
+    Promise.all(promises).get()
+    assert len(results) == 70000
+
+
+def test_then_on_promise_following_subclass():
+    class MyPromise(Promise):
+        pass
+
+    m_p = MyPromise()
+    p = Promise()
+    p.do_resolve(m_p)
+    child = p.then(lambda v: v + 1)
+    m_p.do_resolve(1)
+    assert child.get() == 2
+
+
+def test_promise_has_no_instance_dict():
+    p = Promise()
+    assert not hasattr(p, '__dict__')
+
+
+def test_promise_subclass_with_attributes():
+    class MyPromise(Promise):
+        def __init__(self, executor=None):
+            self.label = 'mine'
+            super(MyPromise, self).__init__(executor)
+
+    p = MyPromise(lambda resolve, reject: resolve(1)).then(lambda v: v + 1)
+    assert isinstance(p, MyPromise)
+    assert p.label == 'mine'
+    assert p.get() == 2
+
+
 def test_promise_repr_pending():
     promise = Promise()
     assert repr(promise) == "<Promise at {} pending>".format(hex(id(promise)))
@@ -683,3 +812,127 @@ def test_promises_promisify_still_works_but_deprecated_for_non_callables():
 
 #     p = Promise(executor)
 #     assert p.get(.1) == 2
+
+
+@fixture
+def fast_path():
+    async_instance.enable_fast_path(max_depth=10)
+    yield async_instance
+    async_instance.disable_fast_path()
+
+
+def test_fast_path_runs_settled_handlers_inline(fast_path):
+    with Context():
+        p = Promise.resolve(1).then(lambda v: v + 1)
+        assert p.is_fulfilled
+        assert p.value == 2
+
+        p = Promise.reject(Exception('Error')).catch(lambda e: str(e))
+        assert p.is_fulfilled
+        assert p.value == 'Error'
+
+
+def test_fast_path_bounds_recursion_depth(fast_path):
+    depths = []
+
+    def nest(n):
+        depths.append(fast_path.fast_path_depth)
+        if n == 0:
+            return n
+        return Promise.resolve(n - 1).then(nest)
+
+    assert Promise.resolve(30).then(nest).get() == 0
+    assert max(depths) == 10
+    assert fast_path.fast_path_depth == 0
+
+
+def test_follow_chain_is_compressed():
+    first = last = Promise()
+    chain = [first]
+    for _ in range(10):
+        followee = Promise()
+        last.do_resolve(followee)
+        last = followee
+        chain.append(last)
+
+    assert first.is_pending
+    for follower in chain[:-1]:
+        assert follower._is_following
+        assert follower._followee() is last
+
+    last.do_resolve(5)
+    assert [p.get() for p in chain] == [5] * 11
+
+
+def test_long_chain_settles_in_constant_stack_depth():
+    def stack_depth():
+        frame = sys._getframe()
+        depth = 0
+        while frame:
+            depth += 1
+            frame = frame.f_back
+        return depth
+
+    depths = set()
+
+    def increment(value):
+        if value % 100000 == 0:
+            depths.add(stack_depth())
+        return value + 1
+
+    root = Promise()
+    # Promise.all results are settled synchronously, as are their children
+    p = Promise.all([root]).then(lambda values: values[0])
+    for _ in range(1000000):
+        p = p.then(increment)
+
+    root.do_resolve(0)
+    assert p.get() == 1000000
+    assert len(depths) == 1
+
+
+def test_get_many():
+    p1 = df(1, 0.02)
+    p2 = Promise.resolve(2)
+    p3 = df(3, 0.01)
+    assert Promise.get_many([p1, p2, p3, 4]) == [1, 2, 3, 4]
+    assert Promise.get_many([]) == []
+
+
+def test_get_many_rejected():
+    p1 = df(1, 0.5)
+    p2 = dr(Exception("Error"), 0.01)
+    with raises(Exception) as exc_info:
+        Promise.get_many([p1, p2], timeout=0.4)
+    assert str(exc_info.value) == "Error"
+
+
+def test_get_many_already_rejected():
+    e = Exception("Error")
+    pending = Promise()
+    with raises(Exception) as exc_info:
+        Promise.get_many([pending, Promise.reject(e)], timeout=5)
+    assert exc_info.value is e
+    assert pending._length == 0
+
+
+def test_get_many_detaches_on_rejection():
+    pending = Promise()
+    e = Exception("Error")
+    with raises(Exception) as exc_info:
+        Promise.get_many([pending, dr(e, 0.01)], timeout=5)
+    assert exc_info.value is e
+    assert pending._length == 0
+
+
+def test_get_many_detaches_on_timeout():
+    pending = Promise()
+    with raises(TimeoutError):
+        Promise.get_many([pending], timeout=0.01)
+    assert pending._length == 0
+
+
+def test_get_many_timeout():
+    p1 = df(1, 0.2)
+    with raises(TimeoutError):
+        Promise.get_many([p1, Promise.resolve(2)], timeout=0.01)
@@ -1,7 +1,7 @@
 from pytest import raises
 
-from promise import Promise
-from promise.promise_list import PromiseList
+from promise import Promise, AggregateError
+from promise.promise_list import PromiseList, SettledResult
 
 
 def all(promises):
@@ -68,3 +68,329 @@ def test_promise_contained_promise():
     assert not all_promises.is_fulfilled
     p.do_resolve(3)
     assert all_promises.get() == [1, 2, 3]
+
+
+def test_promise_lazy_promises_resolved_out_of_order():
+    promises = [Promise() for _ in range(3)]
+    all_promises = all(promises + [4])
+    for i in (2, 0, 1):
+        promises[i].do_resolve(i + 1)
+    assert all_promises.get() == [1, 2, 3, 4]
+
+
+def test_promise_subclass_elements():
+    class MyPromise(Promise):
+        pass
+
+    p = Promise()
+    all_promises = PromiseList([MyPromise.resolve(1), p], MyPromise).promise
+    p.do_resolve(2)
+    assert isinstance(all_promises, MyPromise)
+    assert all_promises.get() == [1, 2]
+
+
+def test_promise_generator():
+    all_promises = all(x for x in [1, Promise.resolve(2), 3])
+    assert all_promises.get() == [1, 2, 3]
+
+
+def test_promise_empty_generator():
+    all_promises = all(x for x in [])
+    assert all_promises.get() == []
+
+
+def test_promise_generator_lazy_promises():
+    promises = [Promise() for _ in range(3)]
+    all_promises = all(iter(promises))
+    assert not all_promises.is_fulfilled
+    promises[1].do_resolve(2)
+    promises[0].do_resolve(1)
+    assert not all_promises.is_fulfilled
+    promises[2].do_resolve(3)
+    assert all_promises.get() == [1, 2, 3]
+
+
+def test_promise_generator_consumed_while_pending():
+    first = Promise()
+    consumed = []
+
+    def values():
+        yield first
+        consumed.append(True)
+        first.do_resolve(1)
+        yield 2
+
+    all_promises = all(values())
+    assert consumed == [True]
+    assert all_promises.get() == [1, 2]
+
+
+def test_promise_generator_rejected():
+    e = Exception("Error")
+    all_promises = all(x for x in [1, Promise.reject(e), 3])
+
+    with raises(Exception) as exc_info:
+        all_promises.get()
+
+    assert str(exc_info.value) == "Error"
+
+
+def test_promise_generator_raises():
+    def values():
+        yield 1
+        raise Exception("Generator failed")
+
+    all_promises = all(values())
+
+    with raises(Exception) as exc_info:
+        all_promises.get()
+
+    assert str(exc_info.value) == "Generator failed"
+
+
+def test_map():
+    assert Promise.map([1, 2, 3], lambda x: x * 2).get() == [2, 4, 6]
+
+
+def test_map_empty():
+    assert Promise.map([], lambda x: x).get() == []
+
+
+def test_map_bounded_concurrency():
+    pending = []
+    in_flight = {'current': 0, 'max': 0}
+
+    def mapper(x):
+        in_flight['current'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['current'])
+        p = Promise()
+        pending.append((p, x))
+        return p
+
+    mapped = Promise.map(iter(range(10)), mapper, concurrency=3)
+    assert len(pending) == 3
+
+    # Settle out of order, the next values are started as slots free up
+    while pending:
+        p, x = pending.pop()
+        in_flight['current'] -= 1
+        p.do_resolve(x * 2)
+
+    assert in_flight['max'] == 3
+    assert mapped.get() == [x * 2 for x in range(10)]
+
+
+def test_map_mixed_values():
+    p = Promise()
+    mapped = Promise.map([1, 2, 3], lambda x: p if x == 2 else x, concurrency=1)
+    assert not mapped.is_fulfilled
+    p.do_resolve(20)
+    assert mapped.get() == [1, 20, 3]
+
+
+def test_map_rejected_stops_mapping():
+    e = Exception("Error")
+    mapped_values = []
+    pending = []
+
+    def mapper(x):
+        mapped_values.append(x)
+        p = Promise()
+        pending.append(p)
+        return p
+
+    mapped = Promise.map([1, 2, 3, 4], mapper, concurrency=2)
+    pending[0].do_reject(e)
+    pending[1].do_resolve(2)
+
+    with raises(Exception) as exc_info:
+        mapped.get()
+
+    assert str(exc_info.value) == "Error"
+    assert mapped_values == [1, 2]
+
+
+def test_map_mapper_raises():
+    def mapper(x):
+        raise Exception("Mapper failed")
+
+    with raises(Exception) as exc_info:
+        Promise.map([1], mapper).get()
+
+    assert str(exc_info.value) == "Mapper failed"
+
+
+def test_map_invalid_concurrency():
+    with raises(TypeError):
+        Promise.map([1], lambda x: x, concurrency=0)
+
+
+def test_all_settled():
+    e = Exception("Error")
+    p = Promise()
+    settled = Promise.all_settled([1, Promise.reject(e), p, Promise.resolve(4)])
+    assert not settled.is_fulfilled
+    p.do_reject(e)
+
+    results = settled.get()
+    assert [r.state for r in results] == [1, 0, 0, 1]
+    assert [r.is_fulfilled for r in results] == [True, False, False, True]
+    assert results[0] == (1, 1)
+    assert results[1].value is e
+    assert results[2].is_rejected and results[2].value is e
+    assert results[3].value == 4
+
+
+def test_all_settled_empty():
+    assert Promise.all_settled([]).get() == []
+
+
+def test_all_settled_generator():
+    results = Promise.all_settled(Promise.resolve(x) for x in range(3)).get()
+    assert [r.value for r in results] == [0, 1, 2]
+
+
+def test_all_settled_records():
+    results = Promise.all_settled([Promise.resolve(1)]).get()
+    assert isinstance(results[0], SettledResult)
+    assert SettledResult.__slots__ == ()
+
+
+def test_race_fulfilled():
+    p1, p2 = Promise(), Promise()
+    raced = Promise.race([p1, p2])
+    p2.do_resolve(2)
+    p1.do_resolve(1)
+    assert raced.get() == 2
+
+
+def test_race_rejected():
+    e = Exception("Error")
+    p1, p2 = Promise(), Promise()
+    raced = Promise.race([p1, p2])
+    p1.do_reject(e)
+    p2.do_resolve(2)
+
+    with raises(Exception) as exc_info:
+        raced.get()
+
+    assert exc_info.value is e
+
+
+def test_race_value():
+    assert Promise.race([Promise(), 1]).get() == 1
+
+
+def test_race_detaches_losers():
+    winner = Promise()
+    losers = [Promise() for _ in range(3)]
+    kept = []
+    losers[0].then(kept.append)
+
+    raced = Promise.race([winner] + losers)
+    assert [loser._length for loser in losers] == [2, 1, 1]
+
+    winner.do_resolve(1)
+    assert raced.get() == 1
+    assert [loser._length for loser in losers] == [1, 0, 0]
+
+    # Callbacks that don't belong to the race are left alone
+    losers[0].do_resolve(2)
+    assert losers[0].then(lambda v: kept).get() == [2]
+
+
+def test_race_detaches_shared_loser():
+    loser = Promise()
+    kept = []
+    loser.then(kept.append)
+    winners = [Promise() for _ in range(3)]
+    races = [Promise.race([winner, loser]) for winner in winners]
+    assert loser._length == 4
+
+    # Detaching from the middle leaves the other slots where they are
+    winners[1].do_resolve(1)
+    assert races[1].get() == 1
+    assert loser._length == 4
+
+    # Detached slots at the end are dropped, with the ones before them
+    winners[2].do_resolve(2)
+    assert races[2].get() == 2
+    assert loser._length == 2
+
+    winners[0].do_resolve(0)
+    assert races[0].get() == 0
+    assert loser._length == 1
+
+    loser.do_resolve(3)
+    assert loser.then(lambda v: kept).get() == [3]
+
+
+def test_race_detaches_all_from_shared_loser():
+    loser = Promise()
+    winners = [Promise() for _ in range(100)]
+    races = [Promise.race([winner, loser]) for winner in winners]
+    for i, winner in enumerate(winners):
+        winner.do_resolve(i)
+    assert [race.get() for race in races] == list(range(100))
+    assert loser._length == 0
+    assert loser._handlers is None
+
+
+def test_race_detaches_following_loser():
+    winner = Promise()
+    followee = Promise()
+    loser = Promise()
+    raced = Promise.race([winner, loser])
+    loser.do_resolve(followee)
+    assert followee._length == 1
+
+    winner.do_resolve(1)
+    assert raced.get() == 1
+    assert followee._length == 0
+
+
+def test_any_fulfilled():
+    e = Exception("Error")
+    p1, p2 = Promise(), Promise()
+    first = Promise.any([Promise.reject(e), p1, p2])
+    p1.do_reject(e)
+    p2.do_resolve(2)
+    assert first.get() == 2
+
+
+def test_any_detaches_losers():
+    p1, p2 = Promise(), Promise()
+    first = Promise.any([p1, p2])
+    p1.do_resolve(1)
+    assert first.get() == 1
+    assert p2._length == 0
+
+
+def test_any_rejected():
+    e1 = Exception("Error1")
+    e2 = Exception("Error2")
+    p = Promise()
+    first = Promise.any([p, Promise.reject(e2)])
+    p.do_reject(e1)
+
+    with raises(AggregateError) as exc_info:
+        first.get()
+
+    assert exc_info.value.errors == [e1, e2]
+
+
+def test_any_empty():
+    with raises(AggregateError) as exc_info:
+        Promise.any([]).get()
+
+    assert exc_info.value.errors == []
+
+
+def test_any_generator_rejected():
+    e = Exception("Error")
+    first = Promise.any(Promise.reject(e) for _ in range(2))
+
+    with raises(AggregateError) as exc_info:
+        first.get()
+
+    assert exc_info.value.errors == [e, e]
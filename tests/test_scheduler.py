@@ -0,0 +1,134 @@
+from threading import Event, Lock, active_count, current_thread
+from time import sleep, time
+from pytest import raises
+
+from promise import (
+    Promise,
+    SyncScheduler,
+    ThreadScheduler,
+    ThreadPoolScheduler,
+    get_default_scheduler,
+    set_default_scheduler,
+)
+from promise.scheduler import delayed_call_pool
+from promise.timer import default_timer
+
+
+def test_thread_pool_scheduler_runs_calls():
+    scheduler = ThreadPoolScheduler(max_workers=2)
+    lock = Lock()
+    calls = []
+    threads = set()
+
+    def call(i):
+        with lock:
+            calls.append(i)
+            threads.add(current_thread())
+
+    for i in range(100):
+        scheduler.call(lambda i=i: call(i))
+
+    scheduler.join()
+    assert sorted(calls) == list(range(100))
+    assert len(threads) <= 2
+    assert current_thread() not in threads
+    scheduler.shutdown()
+
+
+def test_thread_pool_scheduler_bounded_queue():
+    scheduler = ThreadPoolScheduler(max_workers=1, max_queue_size=1)
+    release = Event()
+    calls = []
+
+    scheduler.call(release.wait)
+    scheduler.call(lambda: calls.append(1))
+    # The worker is busy and the queue is full
+    assert scheduler._work_queue.full()
+
+    release.set()
+    scheduler.call(lambda: calls.append(2))
+    scheduler.join()
+    assert calls == [1, 2]
+    scheduler.shutdown()
+
+
+def test_thread_pool_scheduler_worker_calls_run_inline_when_full():
+    scheduler = ThreadPoolScheduler(max_workers=1, max_queue_size=1)
+    calls = []
+
+    def nested():
+        scheduler.call(lambda: calls.append(1))
+        scheduler.call(lambda: calls.append(2))
+        calls.append('nested')
+
+    scheduler.call(nested)
+    scheduler.join()
+    assert calls == [2, 'nested', 1]
+    scheduler.shutdown()
+
+
+def test_thread_pool_scheduler_shutdown():
+    scheduler = ThreadPoolScheduler(max_workers=2)
+    calls = []
+    scheduler.call(lambda: calls.append(1))
+    scheduler.shutdown()
+
+    assert calls == [1]
+    with raises(RuntimeError):
+        scheduler.call(lambda: calls.append(2))
+
+
+def test_thread_pool_scheduler_as_default_scheduler():
+    scheduler = ThreadPoolScheduler(max_workers=2)
+    default_scheduler = get_default_scheduler()
+    set_default_scheduler(scheduler)
+    try:
+        p = Promise()
+        child = p.then(lambda v: v * 2)
+        p.do_resolve(21)
+        assert child.get(1) == 42
+    finally:
+        set_default_scheduler(default_scheduler)
+        scheduler.shutdown()
+
+
+def test_call_later():
+    pool_scheduler = ThreadPoolScheduler(max_workers=1)
+    for scheduler in (SyncScheduler(), ThreadScheduler(), pool_scheduler):
+        done = Event()
+        scheduler.call_later(0.01, done.set)
+        assert done.wait(1)
+    pool_scheduler.shutdown()
+
+
+def test_promise_delay():
+    p = Promise.delay(0.01, 'value')
+    assert p.is_pending
+    assert p.get(1) == 'value'
+
+
+def test_due_timeouts_share_a_bounded_pool():
+    threads_before = active_count()
+    promises = [Promise().timeout(0.01) for _ in range(200)]
+    for promise in promises:
+        with raises(Exception):
+            promise.get(5)
+
+    # The timeouts run on the pool instead of a thread each
+    assert len(delayed_call_pool._threads) <= delayed_call_pool.max_workers
+    assert active_count() - threads_before <= delayed_call_pool.max_workers + 1
+
+
+def test_promise_delay_handlers_do_not_hold_back_other_timers():
+    threads = []
+
+    def slow(value):
+        threads.append(current_thread())
+        sleep(0.3)
+
+    Promise.delay(0.01).then(slow)
+    sleep(0.05)
+    start = time()
+    Promise.delay(0.02).get(1)
+    assert time() - start < 0.2
+    assert threads and threads[0] is not default_timer._thread
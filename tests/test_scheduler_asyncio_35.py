@@ -0,0 +1,124 @@
+from asyncio import get_event_loop, sleep
+from importlib import reload
+from contextlib import contextmanager
+from threading import Thread, current_thread
+from pytest import mark
+
+from promise import (
+    Promise,
+    AsyncioScheduler,
+    ThreadPoolScheduler,
+    get_default_scheduler,
+    set_default_scheduler,
+)
+from promise.dataloader import DataLoader
+
+
+@contextmanager
+def asyncio_scheduler():
+    default_scheduler = get_default_scheduler()
+    set_default_scheduler(AsyncioScheduler(get_event_loop()))
+    try:
+        yield
+    finally:
+        set_default_scheduler(default_scheduler)
+
+
+@mark.asyncio
+async def test_call_runs_on_next_loop_iteration():
+    scheduler = AsyncioScheduler(get_event_loop())
+    calls = []
+    scheduler.call(lambda: calls.append(1))
+    assert calls == []
+
+    await sleep(0)
+    assert calls == [1]
+
+
+@mark.asyncio
+async def test_call_from_another_thread():
+    scheduler = AsyncioScheduler(get_event_loop())
+    calls = []
+    thread = Thread(target=scheduler.call, args=(lambda: calls.append(1), ))
+    thread.start()
+    thread.join()
+
+    await sleep(0.01)
+    assert calls == [1]
+
+
+@mark.asyncio
+async def test_call_later():
+    scheduler = AsyncioScheduler(get_event_loop())
+    calls = []
+    scheduler.call_later(0.01, lambda: calls.append(1))
+    await sleep(0)
+    assert calls == []
+
+    await sleep(0.02)
+    assert calls == [1]
+
+
+@mark.asyncio
+async def test_promise_handlers_run_as_loop_callbacks():
+    with asyncio_scheduler():
+        p = Promise.resolve(1).then(lambda v: v + 1)
+        assert p.is_pending
+
+        assert await p == 2
+
+
+@mark.asyncio
+async def test_dataloader_batches_per_loop_iteration():
+    load_calls = []
+
+    def fn(keys):
+        load_calls.append(keys)
+        return Promise.resolve(keys)
+
+    with asyncio_scheduler():
+        loader = DataLoader(fn)
+        one = loader.load(1)
+        two = loader.load(2)
+
+        assert await Promise.all([one, two]) == [1, 2]
+        assert load_calls == [[1, 2]]
+
+
+@mark.asyncio
+async def test_dataloader_executor_batches_resolve_on_the_loop():
+    load_threads = []
+    handler_threads = []
+
+    def fn(keys):
+        load_threads.append(current_thread())
+        return Promise.resolve(keys)
+
+    executor = ThreadPoolScheduler(max_workers=2)
+    with asyncio_scheduler():
+        # One batch at a time, the rest wait as pending batches
+        loader = DataLoader(fn, max_batch_size=1, batch_executor=executor, max_concurrent_batches=1)
+        promises = [
+            loader.load(key).then(lambda v: handler_threads.append(current_thread()) or v)
+            for key in range(4)
+        ]
+
+        assert await Promise.all(promises) == [0, 1, 2, 3]
+    executor.shutdown()
+
+    assert current_thread() not in load_threads
+    assert handler_threads == [current_thread()] * 4
+
+
+def test_compat_without_get_running_loop(monkeypatch):
+    import asyncio
+    from promise import compat
+    monkeypatch.delattr(asyncio, '_get_running_loop')
+    try:
+        reload(compat)
+        # The event loop is still found, only the running loop isn't
+        assert compat.get_event_loop is asyncio.get_event_loop
+        assert compat.get_running_loop() is None
+    finally:
+        monkeypatch.undo()
+        reload(compat)
@@ -0,0 +1,56 @@
+from threading import Event
+from time import sleep
+
+from promise.timer import TimerQueue
+
+
+def test_timers_run_in_deadline_order():
+    timers = TimerQueue()
+    calls = []
+    done = Event()
+
+    timers.call_later(0.03, done.set)
+    timers.call_later(0.02, lambda: calls.append(2))
+    timers.call_later(0.01, lambda: calls.append(1))
+
+    assert done.wait(1)
+    assert calls == [1, 2]
+    assert len(timers) == 0
+
+
+def test_earlier_timer_wakes_up_the_thread():
+    timers = TimerQueue()
+    done = Event()
+
+    timers.call_later(10, lambda: None)
+    timers.call_later(0.01, done.set)
+
+    assert done.wait(1)
+    assert len(timers) == 1
+
+
+def test_cancelled_timer_does_not_run():
+    timers = TimerQueue()
+    calls = []
+    done = Event()
+
+    timer = timers.call_later(0.01, lambda: calls.append(1))
+    timers.call_later(0.02, done.set)
+    timer.cancel()
+
+    assert done.wait(1)
+    assert calls == []
+    assert timer.fn is None
+
+
+def test_timer_errors_are_ignored():
+    timers = TimerQueue()
+    done = Event()
+
+    def raises():
+        raise Exception("Error")
+
+    timers.call_later(0.01, raises)
+    timers.call_later(0.02, done.set)
+
+    assert done.wait(1)